@@ -0,0 +1,101 @@
+import sys
+import time
+
+import heredity
+from pedigree import generate_pedigree
+
+# Pedigree sizes to time when none are given
+SIZES = [3, 5, 7, 9, 12, 20, 40]
+
+# Largest pedigree each method is run on
+LIMITS = {
+    "enumerate": 9,
+    "vectorized": 9,
+    "circuit": 200,
+    "gibbs": 40,
+}
+
+# Standard error the Gibbs sampler is run to
+GIBBS_ERROR = 0.01
+
+# Most standard errors a sampled probability may be off by
+MAX_DEVIATIONS = 4
+
+# Most an exact probability may be off by, from rounding
+TOLERANCE = 1e-9
+
+
+def main():
+
+    # Use the sizes given on the command line, if any
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    methods = [
+        method for method in heredity.METHODS
+        if method != "vectorized" or heredity.np is not None
+    ]
+
+    print(f"{'size':>6} " + " ".join(f"{method:>12}" for method in methods)
+          + "  max difference")
+    for size in sizes:
+        people = generate_pedigree(size, seed=size)
+        times, difference = benchmark(people, methods)
+        row = " ".join(
+            f"{times[method]:>11.4f}s" if method in times else f"{'-':>12}"
+            for method in methods
+        )
+        print(f"{size:>6} {row}  {difference}")
+
+
+def benchmark(people, methods):
+    """
+    Time every method in `methods` that can handle a pedigree as big as
+    `people`, and check that all their marginals agree.
+    Return a tuple (times, difference) with the time taken by every method
+    that ran and a description of the largest difference between methods.
+    """
+    times = dict()
+    results = dict()
+    errors = dict()
+    for method in methods:
+        if len(people) > LIMITS.get(method, 0):
+            continue
+        start = time.perf_counter()
+        if method == "gibbs":
+            results[method], errors[method] = heredity.gibbs_sample(
+                people, target_error=GIBBS_ERROR
+            )
+        else:
+            results[method] = heredity.METHODS[method](people)
+        times[method] = time.perf_counter() - start
+
+    # Compare everything with the first exact method that ran
+    exact = [method for method in results if method not in errors]
+    if not exact:
+        return times, "no exact method ran"
+    reference = results[exact[0]]
+    worst = (0, None)
+    agree = True
+    for method, probabilities in results.items():
+        for person in people:
+            for field in ["gene", "trait"]:
+                for value in reference[person][field]:
+                    difference = abs(probabilities[person][field][value] -
+                                     reference[person][field][value])
+                    allowed = TOLERANCE
+                    if method in errors:
+                        allowed += (MAX_DEVIATIONS *
+                                    errors[method][person][field][value])
+                    agree = agree and difference <= allowed
+                    if difference > worst[0]:
+                        worst = (difference, method)
+
+    description = f"{worst[0]:.2e}"
+    if worst[1] is not None:
+        description += f" ({worst[1]})"
+    if not agree:
+        description += " DISAGREE"
+    return times, description
+
+
+if __name__ == "__main__":
+    main()
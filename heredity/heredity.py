@@ -1,7 +1,15 @@
 import csv
 import itertools
+import math
+import multiprocessing
+import random
 import sys
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,15 +44,53 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Settings for the Gibbs sampler
+CHAINS = 4
+BLOCK = 4
+BURN_IN = 1000
+SWEEPS = 500
+MAX_SWEEPS = 20000
+TARGET_ERROR = 0.005
+MAX_RHAT = 1.05
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python heredity.py data.csv [method]")
+    method = sys.argv[2] if len(sys.argv) == 3 else "enumerate"
+    if method not in METHODS:
+        sys.exit(f"Unknown method, choose one of: {', '.join(METHODS)}")
+
+    # Read the file one row at a time into families that aren't related
+    # to each other, remembering the order the people came in
+    names = []
+    families = load_families(sys.argv[1], names)
+
+    # Solve every family on its own
+    probabilities, errors = solve_families(families, method)
+
+    # Print results in the order the people are in the file
+    for person in names:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if errors is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    error = errors[person][field][value]
+                    print(f"    {value}: {p:.4f} ± {error:.4f}")
+
+
+def empty_probabilities(people):
+    """
+    Return a gene and trait distribution for every person with all
+    probabilities set to 0.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -58,38 +104,642 @@ def main():
         }
         for person in people
     }
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+def enumerate_probabilities(people):
+    """
+    Compute every person's gene and trait distribution by summing the
+    joint probability of every possible assignment of genes and traits.
+
+    Known traits are fixed rather than enumerated and thrown away. Nobody's
+    trait affects anyone else, so unknown traits are summed out for every
+    assignment of genes instead of being enumerated as well.
+    """
+    probabilities = empty_probabilities(people)
+
+    # Loop over all sets of people who might have the gene
+    for one_gene, two_genes in gene_sets(set(people)):
+        genes = {
+            person: (1 if person in one_gene else
+                     2 if person in two_genes else 0)
+            for person in people
+        }
+
+        # Probability of these genes and of the known traits
+        p = 1
+        for person, info in people.items():
+            gene = genes[person]
+            if info["mother"] is None:
+                p *= PROBS["gene"][gene]
+            else:
+                p *= inherit_probability(
+                    gene, genes[info["mother"]], genes[info["father"]]
+                )
+            if info["trait"] is not None:
+                p *= PROBS["trait"][gene][info["trait"]]
+
+        # Update probabilities, splitting p between unknown traits
+        for person, info in people.items():
+            gene = genes[person]
+            probabilities[person]["gene"][gene] += p
+            if info["trait"] is None:
+                for trait in [True, False]:
+                    probabilities[person]["trait"][trait] += (
+                        p * PROBS["trait"][gene][trait]
+                    )
+            else:
+                probabilities[person]["trait"][info["trait"]] += p
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+
+def gene_sets(names):
+    """
+    Yield every way of splitting `names` into a tuple (one_gene, two_genes)
+    of people with one and two copies of the gene.
+    """
+    for one_gene in powerset(names):
+        for two_genes in powerset(names - one_gene):
+            yield one_gene, two_genes
+
+
+def vectorized_probabilities(people, block_size=2 ** 20):
+    """
+    Compute every person's gene and trait distribution with NumPy.
+
+    Every gene assignment is a row of an integer array (0, 1 or 2 copies
+    per person) and every trait assignment consistent with the evidence is
+    a row of another one (0 or 1 per person). The joint probabilities of
+    all pairs of rows are computed at once by indexing probability tables
+    with those arrays, and the marginals are summed with a single reduction.
+    Gene rows are processed in blocks so that at most about `block_size`
+    table lookups are held in memory at once. The array of all 3 ** n gene
+    rows itself is still built in full before the blocks are taken from it.
+    """
+    if np is None:
+        raise ImportError("vectorized method requires numpy")
+
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+
+    # Probability tables indexed by number of copies (and trait as 0 or 1)
+    gene_table = np.array([PROBS["gene"][gene] for gene in range(3)])
+    trait_table = np.array([
+        [PROBS["trait"][gene][False], PROBS["trait"][gene][True]]
+        for gene in range(3)
+    ])
+    inherit_table = np.array([
+        [
+            [inherit_probability(gene, mother, father) for gene in range(3)]
+            for father in range(3)
+        ]
+        for mother in range(3)
+    ])
+
+    # Split people into those with and without known parents
+    founders = [index[name] for name in names
+                if people[name]["mother"] is None]
+    children = [index[name] for name in names
+                if people[name]["mother"] is not None]
+    mothers = [index[people[names[i]]["mother"]] for i in children]
+    fathers = [index[people[names[i]]["father"]] for i in children]
+
+    # Every trait assignment that agrees with the known traits
+    unknown = [i for i, name in enumerate(names)
+               if people[name]["trait"] is None]
+    traits = np.empty((2 ** len(unknown), n), dtype=np.intp)
+    for i, name in enumerate(names):
+        if people[name]["trait"] is not None:
+            traits[:, i] = int(people[name]["trait"])
+    traits[:, unknown] = assignments(2, len(unknown))
+
+    genes = assignments(3, n)
+    gene_marginals = np.zeros((n, 3))
+    trait_weights = np.zeros(len(traits))
+    step = max(1, block_size // (len(traits) * max(n, 1)))
+    for start in range(0, len(genes), step):
+        block = genes[start:start + step]
+
+        # Probability of each row of genes given the parents' genes
+        factors = np.empty(block.shape)
+        factors[:, founders] = gene_table[block[:, founders]]
+        factors[:, children] = inherit_table[
+            block[:, mothers], block[:, fathers], block[:, children]
+        ]
+
+        # Joint probability of every pair of gene and trait rows
+        joint = factors.prod(axis=1)[:, None] * trait_table[
+            block[:, None, :], traits[None, :, :]
+        ].prod(axis=2)
+
+        gene_marginals += np.einsum(
+            "r,rnk->nk", joint.sum(axis=1), block[:, :, None] == np.arange(3)
+        )
+        trait_weights += joint.sum(axis=0)
+    trait_marginals = np.einsum(
+        "s,snk->nk", trait_weights, traits[:, :, None] == np.arange(2)
+    )
+
+    probabilities = empty_probabilities(people)
+    for i, name in enumerate(names):
+        for gene in range(3):
+            probabilities[name]["gene"][gene] = float(gene_marginals[i, gene])
+        for trait in [True, False]:
+            probabilities[name]["trait"][trait] = float(
+                trait_marginals[i, int(trait)]
+            )
+    normalize(probabilities)
+    return probabilities
+
+
+def assignments(values, count):
+    """
+    Return an integer array with one row for every way of giving each of
+    `count` variables one of `values` values.
+    """
+    return np.indices((values,) * count, dtype=np.intp).reshape(
+        count, values ** count
+    ).T
+
+
+def gibbs_probabilities(people):
+    """
+    Estimate every person's gene and trait distribution with the Gibbs
+    sampler, see `gibbs_sample`.
+    """
+    return gibbs_sample(people)[0]
+
+
+def gibbs_sample(people, chains=CHAINS, target_error=TARGET_ERROR,
+                 seed=0, processes=None):
+    """
+    Estimate every person's gene and trait distribution with Gibbs sampling.
+
+    `chains` independent chains, seeded from `seed`, run in a pool of
+    `processes` worker processes. Each chain repeatedly resamples the
+    number of copies of the gene of one person at a time, together with
+    some of their children's, given everyone else's, and adds up the exact
+    conditional distributions it samples from (rather than the samples
+    themselves), which lowers the variance.
+    Traits are never sampled: known traits are treated as evidence and
+    unknown ones are computed from the gene distribution.
+
+    Chains run in batches of `SWEEPS` sweeps over all people. The standard
+    error of every estimate is the largest of three: the spread of the
+    batch means, the spread of the chains' means, and the largest error
+    plain Monte Carlo could have with as many independent samples as
+    there were sweeps. The last one is a floor for when every chain got
+    stuck in the same states: the first two then come out near 0 even
+    though the states never visited are missing from the estimate, and
+    the estimate itself can't tell how likely those states are. Only
+    estimates that are exactly 0 or 1, like known traits, have no floor.
+    Chains run until every standard error is at most `target_error` and
+    the chains agree (R-hat of every estimate at most `MAX_RHAT`), or
+    every chain has run `MAX_SWEEPS` sweeps.
+    Return a tuple (probabilities, errors), both shaped like the output of
+    the other methods.
+    """
+    model = gibbs_model(people)
+    n = len(people)
+
+    # Start every chain from its own random genes and burn it in before
+    # keeping track of anything
+    states = []
+    for chain in range(chains):
+        rng = random.Random(seed + chain)
+        genes = [rng.randrange(3) for i in range(n)]
+        states.append((genes, rng.getstate()))
+    batches = [[] for chain in range(chains)]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(run_chain, [
+            (model, genes, state, BURN_IN) for genes, state in states
+        ])
+        states = [(genes, state) for genes, state, _, _ in results]
+
+        while True:
+            results = pool.map(run_chain, [
+                (model, genes, state, SWEEPS) for genes, state in states
+            ])
+            states = []
+            for chain, (genes, state, gene_sums, trait_sums) in enumerate(results):
+                states.append((genes, state))
+                batches[chain].append([
+                    [total / SWEEPS for total in gene_sums[i] + [trait_sums[i]]]
+                    for i in range(n)
+                ])
+
+            # Need at least two batches in every chain to measure spreads
+            count = len(batches[0])
+            if count < 2:
+                continue
+            means, errors, rhats = gibbs_errors(batches, n)
+            worst = max(max(error) for error in errors) if n else 0
+            worst_rhat = max(max(rhat) for rhat in rhats) if n else 1
+            if (worst <= target_error and worst_rhat <= MAX_RHAT
+                    or count * SWEEPS >= MAX_SWEEPS):
+                break
+
+    probabilities = empty_probabilities(people)
+    standard_errors = empty_probabilities(people)
+    for i, name in enumerate(people):
+        for gene in range(3):
+            probabilities[name]["gene"][gene] = means[i][gene]
+            standard_errors[name]["gene"][gene] = errors[i][gene]
+        probabilities[name]["trait"][True] = means[i][3]
+        probabilities[name]["trait"][False] = 1 - means[i][3]
+        standard_errors[name]["trait"][True] = errors[i][3]
+        standard_errors[name]["trait"][False] = errors[i][3]
+    return probabilities, standard_errors
+
+
+def gibbs_errors(batches, n):
+    """
+    Return (means, errors, rhats) for `n` people from `batches`, where
+    batches[chain][batch][person] holds the batch means of the gene
+    distribution and trait probability, and every chain has the same
+    number of batches. See `gibbs_sample` for how errors are estimated.
+    """
+    chains = len(batches)
+    count = len(batches[0])
+    samples = chains * count * SWEEPS
+    means = [[0] * 4 for i in range(n)]
+    errors = [[0] * 4 for i in range(n)]
+    rhats = [[1] * 4 for i in range(n)]
+    for i in range(n):
+        for k in range(4):
+            values = [[batch[i][k] for batch in chain] for chain in batches]
+            chain_means = [sum(chain) / count for chain in values]
+            mean = sum(chain_means) / chains
+            means[i][k] = mean
+
+            # Spread of the batch means around their own chain's mean, and
+            # spread of the chain means, as in Gelman and Rubin's R-hat
+            within = sum(
+                (value - chain_mean) ** 2
+                for chain, chain_mean in zip(values, chain_means)
+                for value in chain
+            ) / (chains * (count - 1))
+            between = sum(
+                (chain_mean - mean) ** 2 for chain_mean in chain_means
+            ) / max(chains - 1, 1)
+            if within > 0:
+                pooled = (count - 1) / count * within + between
+                rhats[i][k] = math.sqrt(pooled / within)
+            elif between > 0:
+                rhats[i][k] = math.inf
+
+            floor = 0.25 / samples if 0 < mean < 1 else 0
+            errors[i][k] = math.sqrt(max(
+                within / (chains * count), between / chains, floor, 0
+            ))
+    return means, errors, rhats
+
+
+def gibbs_model(people):
+    """
+    Return the pedigree as plain tuples indexed by position in `people`,
+    so it can be sent to the sampler processes.
+
+    The model holds (persons, blocks, tables). For every person, persons
+    has (mother, father, trait), where mother and father are indexes or
+    None and trait is the known trait or None. For every person, blocks has
+    (block, factors): the people resampled together with that person (the
+    person and up to `BLOCK - 1` of their children) and the people whose
+    probability depends on their genes. Tables holds the probability
+    tables for the genes, traits and inheritance.
+    """
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    persons = tuple(
+        (
+            index.get(people[name]["mother"]),
+            index.get(people[name]["father"]),
+            people[name]["trait"]
+        )
+        for name in names
+    )
+    children = [[] for name in names]
+    for i, (mother, father, trait) in enumerate(persons):
+        if mother is not None:
+            for parent in {mother, father}:
+                children[parent].append(i)
+
+    blocks = []
+    for i in range(len(names)):
+        block = [i] + children[i][:BLOCK - 1]
+        factors = set(block)
+        for member in block:
+            factors.update(children[member])
+        blocks.append((tuple(block), tuple(sorted(factors))))
+
+    gene_table = tuple(PROBS["gene"][gene] for gene in range(3))
+    trait_table = tuple(PROBS["trait"][gene][True] for gene in range(3))
+    inherit_table = tuple(
+        tuple(
+            tuple(inherit_probability(gene, mother, father) for gene in range(3))
+            for father in range(3)
+        )
+        for mother in range(3)
+    )
+    return persons, tuple(blocks), (gene_table, trait_table, inherit_table)
+
+
+def run_chain(args):
+    """
+    Run one Gibbs chain for a number of sweeps.
+
+    `args` is a tuple (model, genes, state, sweeps) where `model` comes from
+    `gibbs_model`, `genes` is the current number of copies of the gene of
+    every person and `state` the state of the chain's random generator.
+    A sweep resamples every person's block in turn. Genes are passed on
+    almost deterministically, so a person's genes can rarely change unless
+    their children's change with them, which is why blocks are used.
+    Return (genes, state, gene_sums, trait_sums): the new genes and random
+    state, and for every person the sum over all sweeps of the conditional
+    gene distribution and of the probability of having the trait.
+    """
+    (persons, blocks, tables), genes, state, sweeps = args
+    gene_table, trait_table, inherit_table = tables
+    rng = random.Random()
+    rng.setstate(state)
+    genes = list(genes)
+    gene_sums = [[0] * 3 for person in persons]
+    trait_sums = [0] * len(persons)
+    choices = dict()
+
+    for sweep in range(sweeps):
+        for i, (block, factors) in enumerate(blocks):
+            size = len(block)
+            if size not in choices:
+                choices[size] = list(itertools.product(range(3), repeat=size))
+
+            # Weight of every choice of genes for the block given the rest
+            weights = []
+            for choice in choices[size]:
+                for member, gene in zip(block, choice):
+                    genes[member] = gene
+                weight = 1
+                for j in factors:
+                    mother, father, trait = persons[j]
+                    if mother is None:
+                        weight *= gene_table[genes[j]]
+                    else:
+                        weight *= inherit_table[genes[mother]][genes[father]][genes[j]]
+                    if trait is not None:
+                        weight *= (trait_table[genes[j]] if trait
+                                   else 1 - trait_table[genes[j]])
+                weights.append(weight)
+
+            # Keep track of the person's conditional distribution
+            total = sum(weights)
+            distribution = [0] * 3
+            for choice, weight in zip(choices[size], weights):
+                distribution[choice[0]] += weight / total
+            for gene in range(3):
+                gene_sums[i][gene] += distribution[gene]
+            if persons[i][2] is None:
+                trait_sums[i] += sum(
+                    distribution[gene] * trait_table[gene] for gene in range(3)
+                )
+            else:
+                trait_sums[i] += persons[i][2]
+
+            # Resample the block's genes
+            choice = rng.choices(choices[size], weights)[0]
+            for member, gene in zip(block, choice):
+                genes[member] = gene
+
+    return genes, rng.getstate(), gene_sums, trait_sums
+
+
+def circuit_probabilities(people):
+    """
+    Compute every person's gene and trait distribution by compiling the
+    family into a `PedigreeCircuit` and evaluating it once.
+    """
+    return PedigreeCircuit(people).probabilities()
+
+
+class PedigreeCircuit():
+    """
+    Arithmetic circuit that computes the probability of the evidence of a
+    family, compiled once so it can be re-evaluated cheaply.
+
+    The circuit is built by variable elimination over the genes of the
+    family. Its leaves are either entries of the probability tables or
+    indicators: one per person and number of copies of the gene, always 1,
+    and one per person and trait value, 0 when the evidence rules that
+    value out. Evaluating the circuit is a single pass over its nodes, and
+    one backward pass then gives the derivative of the probability of the
+    evidence with respect to every indicator, which is the joint
+    probability of that value and the evidence. Dividing by the
+    probability of the evidence gives every person's distributions.
+    """
+
+    def __init__(self, people):
+        """
+        Compile the family in `people`, shaped like the result of
+        `load_data`. The traits in `people` are the default evidence.
+        """
+        self.people = people
+        self.names = list(people)
+
+        # Every node is (operation, children), where operation is "leaf",
+        # "+" or "*" and children are indexes of earlier nodes
+        self.nodes = []
+        self.leaves = []
+        self.cache = dict()
+
+        # Factor tables map a tuple of genes of their variables to a node
+        factors = []
+        for name in self.names:
+            person = people[name]
+            table = dict()
+            for gene in range(3):
+
+                # The trait is only ever seen by its own gene, so sum it out
+                trait = self.add([
+                    self.multiply([
+                        self.leaf(("trait", gene, value)),
+                        self.leaf(("trait indicator", name, value))
+                    ])
+                    for value in [True, False]
+                ])
+                indicator = self.leaf(("gene indicator", name, gene))
+                if person["mother"] is None:
+                    table[(gene,)] = self.multiply([
+                        self.leaf(("gene", gene)), indicator, trait
+                    ])
+                else:
+                    for mother in range(3):
+                        for father in range(3):
+                            table[(gene, mother, father)] = self.multiply([
+                                self.leaf(("inherit", mother, father, gene)),
+                                indicator, trait
+                            ])
+            if person["mother"] is None:
+                factors.append(((name,), table))
+            else:
+                factors.append(
+                    ((name, person["mother"], person["father"]), table)
+                )
+
+        # Eliminate genes one at a time, picking the one whose elimination
+        # creates the smallest factor each time
+        variables = set(self.names)
+        while variables:
+            def size(variable):
+                joined = set()
+                for factor in factors:
+                    if variable in factor[0]:
+                        joined.update(factor[0])
+                return len(joined)
+            variable = min(variables, key=size)
+            variables.remove(variable)
+            related = [factor for factor in factors if variable in factor[0]]
+            factors = [factor for factor in factors if variable not in factor[0]]
+            factors.append(self.eliminate(variable, related))
+
+        self.root = self.multiply([table[()] for _, table in factors])
+
+    def leaf(self, key):
+        """Returns the node of the leaf named `key`."""
+        if key not in self.cache:
+            self.cache[key] = len(self.nodes)
+            self.nodes.append(("leaf", ()))
+            self.leaves.append((key, len(self.nodes) - 1))
+        return self.cache[key]
+
+    def add(self, children):
+        """Returns a node that adds up the `children` nodes."""
+        return self.node("+", children)
+
+    def multiply(self, children):
+        """Returns a node that multiplies the `children` nodes."""
+        return self.node("*", children)
+
+    def node(self, operation, children):
+        """Returns a node for `operation`, reusing an existing one if any."""
+        if len(children) == 1:
+            return children[0]
+        key = (operation, tuple(sorted(children)))
+        if key not in self.cache:
+            self.cache[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.cache[key]
+
+    def eliminate(self, variable, factors):
+        """
+        Multiply `factors` together and sum `variable` out of the product.
+        Return the resulting factor.
+        """
+        variables = []
+        for factor in factors:
+            for other in factor[0]:
+                if other != variable and other not in variables:
+                    variables.append(other)
+
+        table = dict()
+        for genes in itertools.product(range(3), repeat=len(variables)):
+            assignment = dict(zip(variables, genes))
+            terms = []
+            for gene in range(3):
+                assignment[variable] = gene
+                terms.append(self.multiply([
+                    factor_table[tuple(assignment[v] for v in factor_variables)]
+                    for factor_variables, factor_table in factors
+                ]))
+            table[genes] = self.add(terms)
+        return tuple(variables), table
+
+    def evaluate(self, probs=None, evidence=None):
+        """
+        Return the value of every node given the probability tables in
+        `probs` (PROBS by default) and the known traits in `evidence`, a
+        dictionary from names to True, False or None that overrides the
+        traits the circuit was compiled with.
+        """
+        if probs is None:
+            probs = PROBS
+        traits = {name: self.people[name]["trait"] for name in self.names}
+        traits.update(evidence or dict())
+
+        values = [0] * len(self.nodes)
+        for key, node in self.leaves:
+            if key[0] == "gene":
+                values[node] = probs["gene"][key[1]]
+            elif key[0] == "trait":
+                values[node] = probs["trait"][key[1]][key[2]]
+            elif key[0] == "inherit":
+                values[node] = inherit_probability(
+                    key[3], key[1], key[2], probs["mutation"]
+                )
+            elif key[0] == "gene indicator":
+                values[node] = 1
+            else:
+                trait = traits[key[1]]
+                values[node] = 1 if trait is None or trait == key[2] else 0
+
+        for node, (operation, children) in enumerate(self.nodes):
+            if operation == "+":
+                values[node] = sum(values[child] for child in children)
+            elif operation == "*":
+                value = 1
+                for child in children:
+                    value *= values[child]
+                values[node] = value
+        return values
+
+    def differentiate(self, values):
+        """
+        Return the derivative of the root with respect to every node,
+        given the `values` returned by `evaluate`.
+        """
+        derivatives = [0] * len(self.nodes)
+        derivatives[self.root] = 1
+        for node in range(len(self.nodes) - 1, -1, -1):
+            operation, children = self.nodes[node]
+            derivative = derivatives[node]
+            if derivative == 0:
+                continue
+            if operation == "+":
+                for child in children:
+                    derivatives[child] += derivative
+            elif operation == "*":
+
+                # Multiply the other children together, allowing for zeros
+                before = 1
+                after = [1] * (len(children) + 1)
+                for i in range(len(children) - 1, -1, -1):
+                    after[i] = after[i + 1] * values[children[i]]
+                for i, child in enumerate(children):
+                    derivatives[child] += derivative * before * after[i + 1]
+                    before *= values[child]
+        return derivatives
+
+    def probabilities(self, probs=None, evidence=None):
+        """
+        Return every person's gene and trait distribution given `probs`
+        and `evidence` (see `evaluate`), shaped like the other methods.
+        """
+        values = self.evaluate(probs, evidence)
+        derivatives = self.differentiate(values)
+        total = values[self.root]
+
+        probabilities = empty_probabilities(self.names)
+        for key, node in self.leaves:
+            if key[0] == "gene indicator":
+                probabilities[key[1]]["gene"][key[2]] = (
+                    values[node] * derivatives[node] / total
+                )
+            elif key[0] == "trait indicator":
+                probabilities[key[1]]["trait"][key[2]] = (
+                    values[node] * derivatives[node] / total
+                )
+        return probabilities
 
 
 def load_data(filename):
@@ -100,30 +750,152 @@ def load_data(filename):
     trait should be 0 or 1 if trait is known, blank otherwise.
     """
     data = dict()
+    for person in read_people(filename):
+        data[person["name"]] = person
+    return data
+
+
+def read_people(filename):
+    """
+    Yield the people in a file one at a time, in the same format as
+    the values returned by `load_data`.
+    """
     with open(filename) as f:
         reader = csv.DictReader(f)
         for row in reader:
             name = row["name"]
-            data[name] = {
+            yield {
                 "name": name,
                 "mother": row["mother"] or None,
                 "father": row["father"] or None,
                 "trait": (True if row["trait"] == "1" else
                           False if row["trait"] == "0" else None)
             }
-    return data
+
+
+def load_families(filename, names=None):
+    """
+    Load a population from a file as a list of unrelated families,
+    reading it one row at a time. See `split_families`.
+    If `names` is a list, the name of every person is added to it in the
+    order the people are in the file.
+    """
+    def people():
+        """Yields the people in the file, remembering their names."""
+        for person in read_people(filename):
+            if names is not None:
+                names.append(person["name"])
+            yield person
+
+    return split_families(people())
+
+
+def split_families(people):
+    """
+    Split an iterable of people into families: groups of people connected
+    to each other through mother and father links.
+    Return a list of dictionaries shaped like the one returned by
+    `load_data`, in the order the families' first members come in, where
+    every person comes after their parents.
+    """
+    data = dict()
+    roots = dict()
+
+    def find(name):
+        """Returns the name that represents the family of `name`."""
+        roots.setdefault(name, name)
+        while roots[name] != name:
+            roots[name] = roots[roots[name]]
+            name = roots[name]
+        return name
+
+    # Join every person with their parents as the people come in
+    for person in people:
+        name = person["name"]
+        data[name] = person
+        for parent in [person["mother"], person["father"]]:
+            if parent is not None:
+                roots[find(parent)] = find(name)
+
+    groups = dict()
+    for name in data:
+        groups.setdefault(find(name), []).append(name)
+    for name in roots:
+        if name not in data:
+            raise ValueError(f"parent {name} is not in the data")
+    return [sort_family(data, names) for names in groups.values()]
+
+
+def sort_family(data, names):
+    """
+    Return the people in `names` as a dictionary where everyone comes after
+    their parents, keeping the original order where possible.
+    """
+    waiting = dict()
+    children = dict()
+    for name in names:
+        parents = {data[name]["mother"], data[name]["father"]} - {None}
+        waiting[name] = len(parents)
+        for parent in parents:
+            children.setdefault(parent, []).append(name)
+
+    family = dict()
+    ready = [name for name in names if waiting[name] == 0]
+    for name in ready:
+        family[name] = data[name]
+        for child in children.get(name, []):
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                ready.append(child)
+
+    if len(family) != len(names):
+        raise ValueError("someone in the data is their own ancestor")
+    return family
+
+
+def solve_families(families, method="enumerate", processes=None):
+    """
+    Compute the gene and trait distributions of every family with `method`
+    in a pool of `processes` worker processes, and merge them together.
+    Return a tuple (probabilities, errors) where errors is None unless the
+    method estimates its own standard errors.
+    """
+    tasks = [(method, family) for family in families]
+    if len(tasks) < 2 or method in POOLED_METHODS:
+        results = [solve_family(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(solve_family, tasks)
+
+    probabilities = dict()
+    errors = dict() if method in POOLED_METHODS else None
+    for family_probabilities, family_errors in results:
+        probabilities.update(family_probabilities)
+        if errors is not None:
+            errors.update(family_errors)
+    return probabilities, errors
+
+
+def solve_family(task):
+    """
+    Compute the gene and trait distributions of a family, where `task`
+    is a tuple (method, family). Return a tuple (probabilities, errors).
+    """
+    method, family = task
+    if method == "gibbs":
+        return gibbs_sample(family)
+    return METHODS[method](family), None
 
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Yield all possible subsets of set s, one at a time.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    for subset in itertools.chain.from_iterable(
+        itertools.combinations(s, r) for r in range(len(s) + 1)
+    ):
+        yield set(subset)
 
 
 def persons_info(people, one_gene, two_genes, have_trait):
@@ -172,19 +944,11 @@ def joint_probability(people, one_gene, two_genes, have_trait):
             probs.append(prob)
 
         else:
-            father_gave = PROBS["mutation"] if persons[info["father"]
-                                                       ][0] == 0 else 1 - PROBS["mutation"]
-            mother_gave = PROBS["mutation"] if persons[info["mother"]
-                                                       ][0] == 0 else 1 - PROBS["mutation"]
-
-            if persons[person][0] == 0:
-                prob = (1 - father_gave) * (1 - mother_gave)
-
-            elif persons[person][0] == 1:
-                prob = (father_gave) * (1 - mother_gave) + (1 - father_gave) * (mother_gave)
-
-            else:
-                prob = (father_gave) * (mother_gave)
+            prob = inherit_probability(
+                persons[person][0],
+                persons[info["mother"]][0],
+                persons[info["father"]][0]
+            )
 
             prob = prob * PROBS["trait"][persons[person][0]][persons[person][1]]
             probs.append(prob)
@@ -197,6 +961,24 @@ def joint_probability(people, one_gene, two_genes, have_trait):
     raise NotImplementedError
 
 
+def inherit_probability(gene, mother, father, mutation=None):
+    """
+    Return the probability that a child has `gene` copies of the gene
+    given that the mother has `mother` copies and the father `father`.
+    `mutation` defaults to the mutation probability in PROBS.
+    """
+    if mutation is None:
+        mutation = PROBS["mutation"]
+    father_gave = mutation if father == 0 else 1 - mutation
+    mother_gave = mutation if mother == 0 else 1 - mutation
+
+    if gene == 0:
+        return (1 - father_gave) * (1 - mother_gave)
+    elif gene == 1:
+        return (father_gave) * (1 - mother_gave) + (1 - father_gave) * (mother_gave)
+    return (father_gave) * (mother_gave)
+
+
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
     Add to `probabilities` a new joint probability `p`.
@@ -228,5 +1010,16 @@ def normalize(probabilities):
     # raise NotImplementedError
 
 
+METHODS = {
+    "enumerate": enumerate_probabilities,
+    "vectorized": vectorized_probabilities,
+    "gibbs": gibbs_probabilities,
+    "circuit": circuit_probabilities,
+}
+
+# Methods that already use a process pool of their own
+POOLED_METHODS = {"gibbs"}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,111 @@
+import csv
+import random
+import sys
+
+from heredity import PROBS, inherit_probability
+
+# Default shape of generated pedigrees
+FOUNDERS = 0.3
+LOOPS = 0.1
+OBSERVED = 0.5
+WINDOW = 20
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python pedigree.py size output.csv [seed]")
+    size = int(sys.argv[1])
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else 0
+    people = generate_pedigree(size, seed=seed)
+    write_data(people, sys.argv[2])
+
+
+def generate_pedigree(size, founders=FOUNDERS, loops=LOOPS,
+                      observed=OBSERVED, seed=0):
+    """
+    Generate a random pedigree of `size` people over many generations,
+    shaped like the result of `load_data` in heredity.py.
+
+    About a `founders` share of the people have no parents in the data.
+    Everyone else gets parents among the `WINDOW` people before them, so
+    the pedigree grows generation after generation. With probability
+    `loops` the two parents are related to each other, which creates a
+    loop in the pedigree, otherwise they come from different families
+    when possible. Genes and traits are sampled from PROBS, and every
+    person's trait is kept with probability `observed`.
+    """
+    rng = random.Random(seed)
+    people = dict()
+    genes = dict()
+    family = dict()
+
+    for i in range(size):
+        name = f"Person{i}"
+        window = list(people)[-WINDOW:]
+
+        # The first two people always are founders so others have parents
+        if len(window) < 2 or rng.random() < founders:
+            mother = father = None
+            gene = rng.choices(range(3), [PROBS["gene"][g] for g in range(3)])[0]
+            family[name] = name
+        else:
+            mother = rng.choice(window)
+            relatives = [
+                other for other in window
+                if other != mother and family[other] == family[mother]
+            ]
+            strangers = [
+                other for other in window
+                if family[other] != family[mother]
+            ]
+            if relatives and (rng.random() < loops or not strangers):
+                father = rng.choice(relatives)
+            elif strangers:
+                father = rng.choice(strangers)
+            else:
+                father = rng.choice([other for other in window if other != mother])
+            gene = rng.choices(range(3), [
+                inherit_probability(g, genes[mother], genes[father])
+                for g in range(3)
+            ])[0]
+
+            # Marrying joins the two families together
+            joined = family[father]
+            for other in family:
+                if family[other] == joined:
+                    family[other] = family[mother]
+            family[name] = family[mother]
+
+        trait = rng.random() < PROBS["trait"][gene][True]
+        genes[name] = gene
+        people[name] = {
+            "name": name,
+            "mother": mother,
+            "father": father,
+            "trait": trait if rng.random() < observed else None
+        }
+
+    return people
+
+
+def write_data(people, filename):
+    """
+    Write `people` to a CSV file that `load_data` in heredity.py can read.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "mother", "father", "trait"])
+        for person in people.values():
+            trait = person["trait"]
+            writer.writerow([
+                person["name"],
+                person["mother"] or "",
+                person["father"] or "",
+                "" if trait is None else int(trait)
+            ])
+
+
+if __name__ == "__main__":
+    main()
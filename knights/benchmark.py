@@ -0,0 +1,85 @@
+import sys
+import time
+
+import logic
+from generate import knights_puzzle, random_ksat
+
+# Problem sizes to time when none are given: speakers for knights
+# puzzles, symbols for random 3-SAT
+SIZES = {
+    "knights": [3, 5, 8, 10, 12, 20, 50, 200],
+    "ksat": [10, 16, 20, 24, 30, 100, 150],
+}
+
+# Most symbols each engine is run on
+LIMITS = {
+    "knights": {
+        "enumerate": 20,
+        "parallel": 16,
+        "bitwise": 24,
+        "prune": 40,
+        "bdd": 100,
+        "sat": 400,
+    },
+    "ksat": {
+        "enumerate": 18,
+        "parallel": 16,
+        "bitwise": 24,
+        "prune": 24,
+        "bdd": 30,
+        "sat": 150,
+    },
+}
+
+# Functions that generate a problem of some size, with a seed
+GENERATORS = {
+    "knights": knights_puzzle,
+    "ksat": random_ksat,
+}
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) < 2 or sys.argv[1] not in GENERATORS:
+        sys.exit("Usage: python benchmark.py (knights | ksat) [size ...]")
+    suite = sys.argv[1]
+    sizes = [int(size) for size in sys.argv[2:]] or SIZES[suite]
+    engines = list(logic.ENGINES)
+
+    print(f"{'size':>6} {'symbols':>7} "
+          + " ".join(f"{engine:>20}" for engine in engines) + "  answers")
+    for size in sizes:
+        knowledge, symbols = GENERATORS[suite](size, seed=size)
+        times, agree = benchmark(knowledge, symbols, engines, LIMITS[suite])
+        row = " ".join(
+            f"{times[engine]:>9.4f}s {len(symbols) / times[engine]:>7.0f}/s"
+            if engine in times else f"{'-':>20}"
+            for engine in engines
+        )
+        print(f"{size:>6} {len(symbols):>7} {row}  "
+              f"{'agree' if agree else 'DISAGREE'}")
+
+
+def benchmark(knowledge, symbols, engines, limits):
+    """
+    Ask every engine in `engines` that can handle as many symbols as there
+    are in `symbols` which of them knowledge entails, and check that all
+    the engines give the same answers.
+    Return a tuple (times, agree) with the time taken by every engine that
+    ran and whether they all agreed.
+    """
+    times = dict()
+    answers = dict()
+    for engine in engines:
+        if len(symbols) > limits.get(engine, 0):
+            continue
+        start = time.perf_counter()
+        answers[engine] = logic.model_check_all(knowledge, symbols, engine)
+        times[engine] = max(time.perf_counter() - start, 1e-9)
+    agree = len({tuple(answer) for answer in answers.values()}) <= 1
+    return times, agree
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import random
+import sys
+
+from logic import *
+
+# Clauses per symbol where random 3-SAT goes from mostly satisfiable to
+# mostly unsatisfiable, and is hardest
+RATIO = 4.26
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [3, 4] or sys.argv[1] not in ["knights", "ksat"]:
+        sys.exit("Usage: python generate.py (knights | ksat) size [seed]")
+    size = int(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else 0
+
+    if sys.argv[1] == "knights":
+        knowledge, symbols = knights_puzzle(size, seed=seed)
+    else:
+        knowledge, symbols = random_ksat(size, seed=seed)
+    print(knowledge.formula())
+    print(f"{len(symbols)} symbols, {len(knowledge.conjuncts)} sentences")
+
+
+def random_ksat(size, k=3, ratio=RATIO, seed=0):
+    """
+    Generate a random k-SAT problem with `size` symbols and about
+    `ratio` times as many clauses, each the Or of k different symbols
+    negated at random.
+    Return a tuple (knowledge, symbols).
+    """
+    rng = random.Random(seed)
+    symbols = [Symbol(f"X{i}") for i in range(size)]
+    knowledge = And()
+    for clause in range(round(size * ratio)):
+        knowledge.add(Or(*[
+            symbol if rng.random() < 0.5 else Not(symbol)
+            for symbol in rng.sample(symbols, min(k, size))
+        ]))
+    return knowledge, symbols
+
+
+def knights_puzzle(speakers, seed=0):
+    """
+    Generate a knights and knaves puzzle with `speakers` people, where
+    everyone is either a knight or a knave and says one thing about one or
+    two of the others. People are given a secret kind first and every
+    statement is made true or false to match the speaker's kind, so the
+    puzzle always has at least one solution.
+    Return a tuple (knowledge, symbols) with two symbols per person.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"P{i} is a Knight") for i in range(speakers)]
+    knaves = [Symbol(f"P{i} is a Knave") for i in range(speakers)]
+    secret = [rng.random() < 0.5 for i in range(speakers)]
+    model = dict()
+    for i in range(speakers):
+        model[knights[i].name] = secret[i]
+        model[knaves[i].name] = not secret[i]
+
+    knowledge = And()
+    for i in range(speakers):
+        knowledge.add(Or(knights[i], knaves[i]))
+        knowledge.add(Not(And(knights[i], knaves[i])))
+    for i in range(speakers):
+        others = [j for j in range(speakers) if j != i] or [i]
+        x, y = rng.choice(others), rng.choice(others)
+        statement = rng.choice([
+            knights[x],
+            knaves[x],
+            Biconditional(knights[x], knights[y]),
+            Or(knaves[x], knaves[y]),
+            And(knights[x], knaves[y]),
+        ])
+
+        # Knights only say true things and knaves only false ones
+        if statement.evaluate(model) != secret[i]:
+            statement = Not(statement)
+        knowledge.add(Implication(knights[i], statement))
+        knowledge.add(Implication(knaves[i], Not(statement)))
+
+    symbols = [symbol for pair in zip(knights, knaves) for symbol in pair]
+    return knowledge, symbols
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,86 @@
+import heapq
 import itertools
+import math
+import multiprocessing
+import weakref
 
+# Symbols the bitwise engine packs every combination of into one integer
+BLOCK = 16
 
-class Sentence():
+# Most symbols left free in one task of the parallel engine, so workers
+# look at the stop flag at least every 2 ** FREE models
+FREE = 14
+
+# Compiled sentence and stop flag of a parallel worker process
+worker = dict()
+
+
+# Number of times a conjunct has been added to any And, so that sentences
+# with an And inside them know when their cached hash and symbols are stale
+changes = 0
+
+# Every sentence without an And inside, by its class and arguments
+interned = weakref.WeakValueDictionary()
+
+
+class Interned(type):
+    """
+    Metaclass of sentences: creating a sentence equal to one that already
+    exists returns the existing one, unless there is an And (which can
+    change) inside it. Equal sentences then are the same object, so they
+    share their cached hash and symbols and compare by identity.
+    """
+
+    def __call__(cls, *args):
+        sentence = super().__call__(*args)
+        sentence.frozen = not cls.mutable and all(
+            part.frozen for part in sentence.parts()
+        )
+        sentence.cached_hash = sentence.cached_symbols = None
+        sentence.seen_changes = changes
+        if not sentence.frozen:
+            return sentence
+        return interned.setdefault((cls, sentence.arguments()), sentence)
+
+
+class Sentence(metaclass=Interned):
+    __slots__ = ("frozen", "cached_hash", "cached_symbols", "seen_changes",
+                 "__weakref__")
+
+    # True for sentences that can change after they are created
+    mutable = False
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+
+        # Two different sentences without an And inside can't be equal
+        if self.frozen and getattr(other, "frozen", False):
+            return False
+        return type(self) is type(other) and self.arguments() == other.arguments()
+
+    def __hash__(self):
+        self.refresh()
+        if self.cached_hash is None:
+            self.cached_hash = hash((type(self), self.arguments()))
+        return self.cached_hash
+
+    def __reduce__(self):
+        return (type(self), self.arguments())
+
+    def arguments(self):
+        """Returns the tuple of arguments the sentence was created with."""
+        return ()
+
+    def parts(self):
+        """Returns the tuple of sentences directly inside the sentence."""
+        return self.arguments()
+
+    def refresh(self):
+        """Forgets the cached hash and symbols if an And inside changed."""
+        if not self.frozen and self.seen_changes != changes:
+            self.cached_hash = self.cached_symbols = None
+            self.seen_changes = changes
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +92,23 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """Returns the cached frozenset of all symbols in the sentence."""
+        self.refresh()
+        if self.cached_symbols is None:
+            self.cached_symbols = frozenset().union(
+                *[part.symbol_set() for part in self.parts()]
+            )
+        return self.cached_symbols
+
+    def code(self, slots):
+        """
+        Returns a Python expression for the logical sentence, where the
+        value of every symbol is `model[slots[name]]`.
+        """
+        raise Exception("nothing to compile")
 
     @classmethod
     def validate(cls, sentence):
@@ -43,19 +138,20 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
-
     def __repr__(self):
         return self.name
 
+    def arguments(self):
+        return (self.name,)
+
+    def parts(self):
+        return ()
+
     def evaluate(self, model):
         try:
             return bool(model[self.name])
@@ -65,57 +161,61 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def symbol_set(self):
+        if self.cached_symbols is None:
+            self.cached_symbols = frozenset([self.name])
+        return self.cached_symbols
+
+    def code(self, slots):
+        return f"model[{slots[self.name]}]"
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
-
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
-
     def __repr__(self):
         return f"Not({self.operand})"
 
+    def arguments(self):
+        return (self.operand,)
+
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def code(self, slots):
+        return f"(not {self.operand.code(slots)})"
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+    mutable = True
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
-
     def __repr__(self):
         conjunctions = ", ".join(
             [str(conjunct) for conjunct in self.conjuncts]
         )
         return f"And({conjunctions})"
 
+    def arguments(self):
+        return tuple(self.conjuncts)
+
     def add(self, conjunct):
+        global changes
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        changes += 1
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,28 +226,29 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def code(self, slots):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.code(slots) for conjunct in self.conjuncts
+        ) + ")"
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
-
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
+    def arguments(self):
+        return tuple(self.disjuncts)
+
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
@@ -157,28 +258,29 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def code(self, slots):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.code(slots) for disjunct in self.disjuncts
+        ) + ")"
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
-
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
+    def arguments(self):
+        return (self.antecedent, self.consequent)
+
     def evaluate(self, model):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
@@ -188,28 +290,27 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def code(self, slots):
+        antecedent = self.antecedent.code(slots)
+        consequent = self.consequent.code(slots)
+        return f"(not {antecedent} or {consequent})"
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
-
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
+    def arguments(self):
+        return (self.left, self.right)
+
     def evaluate(self, model):
         return ((self.left.evaluate(model)
                  and self.right.evaluate(model))
@@ -221,43 +322,983 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    def code(self, slots):
+        return f"({self.left.code(slots)} == {self.right.code(slots)})"
+
+
+def model_check(knowledge, query, engine="enumerate"):
+    """
+    Checks if knowledge base entails query, using one of the ENGINES:
+    "enumerate" tries every model with compiled sentences, "parallel"
+    splits those models between processes, "bitwise" tries many models at
+    once with bitwise operations, "prune" stops trying models as soon as a
+    partial model decides, "bdd" compiles both into binary decision
+    diagrams and "sat" asks the SAT solver whether knowledge and not query
+    can be true together.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine}")
+    return ENGINES[engine](knowledge, query)
+
+
+def model_check_all(knowledge, queries, engine="enumerate"):
+    """
+    Returns a list with True for every query in `queries` that knowledge
+    base entails and False for the others. Engines in BATCH_ENGINES look
+    at the knowledge base once for all the queries, the others check the
+    queries one by one.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine}")
+    if engine in BATCH_ENGINES:
+        return BATCH_ENGINES[engine](knowledge, queries)
+    return [ENGINES[engine](knowledge, query) for query in queries]
+
+
+def enumerate_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by trying every model, with
+    both compiled into one function that is called once per model.
+    """
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # Knowledge base entails query if this holds in every model
+    holds = compile_sentence(Implication(knowledge, query), symbols)
+    models = itertools.product([True, False], repeat=len(symbols))
+    return all(map(holds, models))
+
+
+def enumerate_check_all(knowledge, queries):
+    """
+    Checks which queries knowledge base entails by trying every model
+    once: a query is crossed off as soon as a model of the knowledge base
+    makes it false, and the search stops when none is left.
+    """
+    symbols = sorted(set.union(
+        knowledge.symbols(), *[query.symbols() for query in queries]
+    ))
+    holds = compile_sentence(knowledge, symbols)
+    checks = [compile_sentence(query, symbols) for query in queries]
+
+    entailed = [True] * len(queries)
+    left = list(range(len(queries)))
+    for model in itertools.product([True, False], repeat=len(symbols)):
+        if not left:
+            break
+        if holds(model):
+            for i in left:
+                if not checks[i](model):
+                    entailed[i] = False
+            left = [i for i in left if entailed[i]]
+    return entailed
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Returns a function that evaluates `sentence` on a model given as a
+    sequence of truth values, one for every symbol name in `symbols`.
+    The sentence is turned into a single Python expression, so evaluating
+    it doesn't walk the tree or look up names. Sentences nested too deeply
+    for Python to compile are evaluated with `evaluate` instead.
+    """
+    slots = {name: i for i, name in enumerate(symbols)}
+    try:
+        return eval(f"lambda model: {sentence.code(slots)}")
+    except (SyntaxError, RecursionError, MemoryError):
+        return lambda model: sentence.evaluate(dict(zip(symbols, model)))
+
+
+def parallel_check(knowledge, query, processes=None):
+    """
+    Checks if knowledge base entails query by trying every model on
+    `processes` processes (all cores if None). The first few symbols are
+    fixed to each of their combinations, and every combination is a task
+    for the pool, giving about four tasks per process. Every worker
+    compiles the sentence once, and they all stop as soon as one finds a
+    model where knowledge holds and query doesn't.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    sentence = Implication(knowledge, query)
+    processes = processes or multiprocessing.cpu_count()
+    fixed = min(len(symbols), max((processes * 4 - 1).bit_length(),
+                                  len(symbols) - FREE))
+    prefixes = itertools.product([True, False], repeat=fixed)
+
+    if processes == 1:
+        start_worker(sentence, symbols, fixed, None)
+        return all(map(check_prefix, prefixes))
+
+    stop = multiprocessing.Event()
+    with multiprocessing.Pool(processes, start_worker,
+                              (sentence, symbols, fixed, stop)) as pool:
+        for holds in pool.imap_unordered(check_prefix, prefixes, 16):
+            if holds is False:
+                stop.set()
+                return False
+    return True
+
+
+def start_worker(sentence, symbols, fixed, stop):
+    """
+    Compiles `sentence` for the tasks this process will run, where the
+    first `fixed` symbols come from the task and `stop` is set once the
+    answer is known.
+    """
+    worker["holds"] = compile_sentence(sentence, symbols)
+    worker["free"] = len(symbols) - fixed
+    worker["stop"] = stop
+
+
+def check_prefix(prefix):
+    """
+    Returns True if the worker's sentence holds in every model starting
+    with the values in `prefix`, False if not, or None if it was stopped.
+    """
+    stop = worker["stop"]
+    if stop is not None and stop.is_set():
+        return None
+    models = itertools.product(*[[value] for value in prefix],
+                               *[[True, False]] * worker["free"])
+    return all(map(worker["holds"], models))
+
+
+def bitwise_check(knowledge, query, processes=None):
+    """
+    Checks if knowledge base entails query on many models at once.
+
+    Every combination of the first BLOCK symbols is one bit of a Python
+    integer, so a symbol is the integer with a bit set for every model
+    where it is true, and a sentence is evaluated on all those models with
+    a few bitwise operations. The other symbols are fixed to each of their
+    combinations in turn, one block at a time, and the blocks are split
+    between `processes` processes (all cores if None).
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    low = min(len(symbols), BLOCK)
+    blocks = 2 ** (len(symbols) - low)
+    processes = min(processes or multiprocessing.cpu_count(), blocks)
+    sentence = Implication(knowledge, query)
+
+    chunks = processes * 4 if processes > 1 else 1
+    tasks = [(sentence, symbols, low, blocks * i // chunks,
+              blocks * (i + 1) // chunks) for i in range(chunks)]
+    if processes == 1:
+        return all(map(check_blocks, tasks))
+
+    # Stop every process as soon as one finds a model where query is false
+    with multiprocessing.Pool(processes) as pool:
+        return all(pool.imap_unordered(check_blocks, tasks))
+
+
+def check_blocks(task):
+    """
+    Checks a sentence in every model of a range of blocks, where `task`
+    is a tuple (sentence, symbols, low, start, end) and the first `low`
+    symbols vary inside a block. Returns True if the sentence holds in all.
+    """
+    sentence, symbols, low, start, end = task
+    full = (1 << (1 << low)) - 1
+    model = dict()
+    for i, name in enumerate(symbols[:low]):
+
+        # Bit j is set if symbol i is true in model j of the block
+        width = 1 << i
+        bits = ((1 << width) - 1) << width
+        width *= 2
+        while width < 1 << low:
+            bits |= bits << width
+            width *= 2
+        model[name] = bits
+
+    for block in range(start, end):
+        for i, name in enumerate(symbols[low:]):
+            model[name] = full if block >> i & 1 else 0
+        if bitwise_value(sentence, model, full) != full:
+            return False
+    return True
+
+
+def bitwise_value(sentence, model, full):
+    """
+    Returns the integer with a bit set for every model where `sentence` is
+    true, where `model` maps every symbol name to such an integer and
+    `full` has a bit set for every model.
+    """
+    if isinstance(sentence, Symbol):
+        return model[sentence.name]
+    if isinstance(sentence, Not):
+        return full ^ bitwise_value(sentence.operand, model, full)
+    if isinstance(sentence, And):
+        bits = full
+        for conjunct in sentence.conjuncts:
+            bits &= bitwise_value(conjunct, model, full)
+        return bits
+    if isinstance(sentence, Or):
+        bits = 0
+        for disjunct in sentence.disjuncts:
+            bits |= bitwise_value(disjunct, model, full)
+        return bits
+    if isinstance(sentence, Implication):
+        return ((full ^ bitwise_value(sentence.antecedent, model, full))
+                | bitwise_value(sentence.consequent, model, full))
+    if isinstance(sentence, Biconditional):
+        return full ^ (bitwise_value(sentence.left, model, full)
+                       ^ bitwise_value(sentence.right, model, full))
+    raise TypeError("must be a logical sentence")
+
+
+def prune_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by assigning one symbol at a
+    time and evaluating knowledge => query on the partial model with
+    three-valued logic, where a symbol not assigned yet is unknown (None).
+    A branch stops as soon as the value is known: true means knowledge is
+    false or query is true in every model below it, false means a model
+    where knowledge holds and query doesn't.
+    """
+
+    # Assign the symbols that appear most often first
+    sentence = Implication(knowledge, query)
+    counts = dict()
+    count_symbols(sentence, counts)
+    symbols = sorted(counts, key=counts.get, reverse=True)
+    lowered = lower(sentence, {name: i for i, name in enumerate(symbols)})
+
+    # The values of the symbols by slot, set and undone in place
+    values = [None] * len(symbols)
+
+    def check_all(i):
+        """Checks entailment in every model of the unassigned symbols."""
+        value = partial_value(lowered, values)
+        if value is not None:
+            return value
+        for truth in [True, False]:
+            values[i] = truth
+            holds = check_all(i + 1)
+            values[i] = None
+            if not holds:
+                return False
+        return True
+
+    return check_all(0)
+
+
+def count_symbols(sentence, counts):
+    """Adds how many times every symbol appears in `sentence` to `counts`."""
+    if isinstance(sentence, Symbol):
+        counts[sentence.name] = counts.get(sentence.name, 0) + 1
+    for part in sentence.parts():
+        count_symbols(part, counts)
+
+
+def lower(sentence, slots):
+    """
+    Returns `sentence` as nested tuples (operator, operands...), with
+    implications and biconditionals kept as they are and a symbol turned
+    into ("symbol", slot) with its slot from `slots`.
+    """
+    if isinstance(sentence, Symbol):
+        return ("symbol", slots[sentence.name])
+    operator = type(sentence).__name__.lower()
+    return (operator,) + tuple(lower(part, slots) for part in sentence.parts())
+
+
+def partial_value(lowered, values):
+    """
+    Returns the value of a lowered sentence as True, False, or None if it
+    depends on symbols whose value in `values` is None.
+    """
+    operator = lowered[0]
+    if operator == "symbol":
+        return values[lowered[1]]
+    if operator == "not":
+        value = partial_value(lowered[1], values)
+        return None if value is None else not value
+    if operator == "and":
+        result = True
+        for operand in lowered[1:]:
+            value = partial_value(operand, values)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+    if operator == "or":
+        result = False
+        for operand in lowered[1:]:
+            value = partial_value(operand, values)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+    if operator == "implication":
+        antecedent = partial_value(lowered[1], values)
+        if antecedent is False:
+            return True
+        consequent = partial_value(lowered[2], values)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+    left = partial_value(lowered[1], values)
+    if left is None:
+        return None
+    right = partial_value(lowered[2], values)
+    if right is None:
+        return None
+    return left == right
+
+
+def sat_check(knowledge, query):
+    """
+    Checks if knowledge base entails query with the SAT solver: it does
+    unless knowledge and not query are satisfiable together.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    return not cnf.solver.solve([-cnf.literal(query)])
+
+
+def sat_check_all(knowledge, queries):
+    """
+    Checks which queries knowledge base entails with one SAT solver that
+    keeps what it learned between queries, assuming each query false in
+    turn.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    return [not cnf.solver.solve([-cnf.literal(query)]) for query in queries]
+
+
+class KnowledgeBase():
+    """
+    Knowledge that grows one sentence at a time and answers questions
+    with a SAT solver that is kept between calls: every sentence is turned
+    into clauses once when it is added, and whatever the solver learns
+    answering one question helps with the next ones.
+
+    A sentence is encoded when it is added, so changing it afterwards
+    (with And.add) doesn't change the knowledge base.
+    """
+
+    def __init__(self, *sentences):
+        self.knowledge = And()
+        self.cnf = CNF()
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds `sentence` to the knowledge."""
+        Sentence.validate(sentence)
+        self.knowledge.add(sentence)
+        self.cnf.add(sentence)
+
+    def consistent(self, assuming=()):
+        """
+        Returns True if the knowledge, together with the sentences in
+        `assuming`, can all be true.
+        """
+        return self.cnf.solver.solve(
+            [self.cnf.literal(sentence) for sentence in assuming]
+        )
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    def entails(self, query, assuming=()):
+        """
+        Returns True if the knowledge, together with the sentences in
+        `assuming`, entails `query`. The assumptions only hold for this
+        question and are not added to the knowledge.
+        """
+        return not self.consistent(list(assuming) + [Not(query)])
+
+    def entails_all(self, queries, assuming=()):
+        """Returns a list with whether the knowledge entails every query."""
+        return [self.entails(query, assuming) for query in queries]
+
+
+class CNF():
+    """
+    Turns sentences into clauses for a Solver with the Tseitin
+    transformation: every compound sentence gets a new variable that is
+    true exactly when the sentence is, so the clauses only grow linearly
+    with the size of the sentence.
+    Variables are positive integers and literals are +v or -v.
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver or Solver()
+        self.variables = dict()
+        self.literals = dict()
+        self.true = None
+
+    def variable(self, name):
+        """Returns the variable of the symbol called `name`."""
+        if name not in self.variables:
+            self.variables[name] = self.solver.new_variable()
+        return self.variables[name]
+
+    def add(self, sentence):
+        """Adds clauses that make `sentence` true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        else:
+            self.solver.add_clause([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when `sentence` is."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        add_clause = self.solver.add_clause
+        if isinstance(sentence, And):
+            children = [self.literal(c) for c in sentence.conjuncts]
+            if not children:
+                return self.constant()
+            a = self.solver.new_variable()
+            for child in children:
+                add_clause([-a, child])
+            add_clause([a] + [-child for child in children])
+        elif isinstance(sentence, Or):
+            children = [self.literal(d) for d in sentence.disjuncts]
+            if not children:
+                return -self.constant()
+            a = self.solver.new_variable()
+            for child in children:
+                add_clause([a, -child])
+            add_clause([-a] + children)
+        elif isinstance(sentence, Implication):
+            p = self.literal(sentence.antecedent)
+            q = self.literal(sentence.consequent)
+            a = self.solver.new_variable()
+            add_clause([a, p])
+            add_clause([a, -q])
+            add_clause([-a, -p, q])
+        elif isinstance(sentence, Biconditional):
+            p = self.literal(sentence.left)
+            q = self.literal(sentence.right)
+            a = self.solver.new_variable()
+            add_clause([-a, -p, q])
+            add_clause([-a, p, -q])
+            add_clause([a, p, q])
+            add_clause([a, -p, -q])
+        else:
+            raise TypeError("must be a logical sentence")
+        self.literals[sentence] = a
+        return a
+
+    def constant(self):
+        """Returns a literal that is always true."""
+        if self.true is None:
+            self.true = self.solver.new_variable()
+            self.solver.add_clause([self.true])
+        return self.true
+
+
+class Solver():
+    """
+    CDCL SAT solver: unit propagation with two watched literals per clause,
+    clause learning from the first unique implication point with
+    non-chronological backjumping, VSIDS variable activities and restarts.
+
+    Clauses can be added between calls to `solve`, and every call can be
+    given assumptions, so learned clauses are kept from one call to the next.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.watches = dict()
+        self.assigns = [None]
+        self.values = dict()
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0]
+        self.polarity = [False]
+        self.heap = []
+        self.increment = 1
+        self.trail = []
+        self.trail_lim = []
+        self.head = 0
+        self.ok = True
+        self.model = dict()
+        self.conflicts = 0
+
+    def new_variable(self):
+        """Returns a new variable."""
+        self.assigns.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0)
+        self.polarity.append(False)
+        v = len(self.assigns) - 1
+        self.watches[v] = []
+        self.watches[-v] = []
+        heapq.heappush(self.heap, (0, v))
+        return v
+
+    def value(self, literal):
+        """Returns True, False or None for an assigned or free literal."""
+        return self.values.get(literal)
+
+    def add_clause(self, clause):
+        """
+        Adds a clause, a list of literals at least one of which must be
+        true. Returns False if the clauses can no longer be satisfied.
+        """
+        self.cancel(0)
+        if not self.ok:
+            return False
+
+        # Drop literals already false, skip clauses already true
+        literals = []
+        for literal in clause:
+            value = self.value(literal)
+            if value is True or -literal in literals:
+                return True
+            if value is None and literal not in literals:
+                literals.append(literal)
+
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.enqueue(literals[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(literals)
+        return self.ok
+
+    def attach(self, literals):
+        """Stores a clause and watches its first two literals."""
+        self.clauses.append(literals)
+        index = len(self.clauses) - 1
+        self.watches[literals[0]].append(index)
+        self.watches[literals[1]].append(index)
+        return index
+
+    def enqueue(self, literal, reason):
+        """Makes `literal` true because of clause `reason` (or a decision)."""
+        v = abs(literal)
+        self.assigns[v] = literal > 0
+        self.values[literal] = True
+        self.values[-literal] = False
+        self.levels[v] = len(self.trail_lim)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Makes every literal true that is the last free one of its clause.
+        Returns the index of a clause that became false, or None.
+        """
+        values = self.values
+        clauses = self.clauses
+        watches = self.watches
+        trail = self.trail
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            kept = []
+            conflict = None
+            for n, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = values.get(clause[0])
+                if first:
+                    kept.append(index)
+                    continue
+
+                # Look for another literal to watch instead
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if values.get(literal) is not False:
+                        clause[1], clause[k] = literal, false
+                        watches[literal].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if first is False:
+                        conflict = index
+                        kept.extend(watching[n + 1:])
+                        break
+                    self.enqueue(clause[0], index)
+            watches[false] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (clause, level): a clause learned from the conflicting
+        clause, whose first literal is the only one from the current level,
+        and the level to jump back to.
+        """
+        learned = [None]
+        seen = set()
+        level = len(self.trail_lim)
+        counter = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in (clause if literal is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] == level:
+                        counter += 1
+                    else:
+                        learned.append(q)
+
+            # Go back along the trail to the next literal to resolve on
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            seen.discard(abs(literal))
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learned[0] = -literal
+
+        # Watch the literal of the highest level after the first one
+        if len(learned) == 1:
+            return learned, 0
+        highest = max(range(1, len(learned)),
+                      key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, v):
+        """Raises the activity of variable v."""
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-a, u) for u, a in enumerate(self.activity)
+                         if u and self.assigns[u] is None]
+            heapq.heapify(self.heap)
+        elif self.assigns[v] is None:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def cancel(self, level):
+        """Takes back every assignment made after decision level `level`."""
+        if len(self.trail_lim) <= level:
+            return
+        for literal in self.trail[self.trail_lim[level]:]:
+            v = abs(literal)
+            self.assigns[v] = None
+            del self.values[literal], self.values[-literal]
+            self.reasons[v] = None
+            self.polarity[v] = literal > 0
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the free variable with the highest activity, or None."""
+        while self.heap:
+            activity, v = heapq.heappop(self.heap)
+            if self.assigns[v] is None and -activity == self.activity[v]:
+                return v
+        return None
+
+    def solve(self, assumptions=[]):
+        """
+        Returns True if the clauses can all be true while every literal in
+        `assumptions` is true, and False otherwise. If True, `model` maps
+        every variable to its value in one such assignment.
+        """
+        self.cancel(0)
+        if not self.ok or self.propagate() is not None:
+            self.ok = False
+            return False
+
+        restart = 1
+        budget = 100 * luby(restart)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.cancel(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.enqueue(learned[0], self.attach(learned))
+                self.increment /= 0.95
+                continue
+
+            if budget <= 0:
+                restart += 1
+                budget = 100 * luby(restart)
+                self.cancel(0)
+                continue
+
+            # Decide the assumptions first, then the most active variable
+            literal = None
+            while len(self.trail_lim) < len(assumptions):
+                assumption = assumptions[len(self.trail_lim)]
+                value = self.value(assumption)
+                if value is False:
+                    self.cancel(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    literal = assumption
+                    break
+            if literal is None:
+                v = self.decide()
+                if v is None:
+                    self.model = {
+                        v: self.assigns[v] for v in range(1, len(self.assigns))
+                    }
+                    self.cancel(0)
+                    return True
+                literal = v if self.polarity[v] else -v
+                self.trail_lim.append(len(self.trail))
+            self.enqueue(literal, None)
+
+
+def luby(i):
+    """Returns the i-th number (from 1) of the Luby sequence 1 1 2 1 1 2 4..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+def bdd_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by compiling both into binary
+    decision diagrams: it does if knowledge and not query is the false one.
+    """
+    bdd = BDD(order_symbols(Implication(knowledge, query)))
+    return bdd.entails(bdd.compile(knowledge), bdd.compile(query))
+
+
+def bdd_check_all(knowledge, queries):
+    """
+    Checks which queries knowledge base entails, compiling knowledge base
+    into a binary decision diagram once and sharing its nodes with the
+    diagrams of all the queries.
+    """
+    bdd = BDD(order_symbols(And(knowledge, *queries)))
+    compiled = bdd.compile(knowledge)
+    return [bdd.entails(compiled, bdd.compile(query)) for query in queries]
+
+
+def order_symbols(sentence, heuristic="appearance"):
+    """
+    Returns the names of the symbols in `sentence` in an order for a BDD:
+    "appearance" puts them in the order they first appear, so symbols used
+    together stay close, and "frequency" puts the most used ones first.
+    """
+    counts = dict()
+    count_symbols(sentence, counts)
+    if heuristic == "frequency":
+        return sorted(counts, key=counts.get, reverse=True)
+    if heuristic == "appearance":
+        return list(counts)
+    raise ValueError(f"unknown heuristic {heuristic}")
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagrams sharing their nodes.
+
+    A node is an integer: 0 and 1 are false and true, and every other
+    node tests the symbol at some level of `order` and goes to a low node
+    if it is false or a high node if it is true. The unique table makes
+    sure no two nodes are the same, so equal sentences compile to the
+    same node, and results of `apply` are remembered in a cache.
+    """
+
+    def __init__(self, order=()):
+        self.order = list(order)
+        self.levels = {name: i for i, name in enumerate(self.order)}
+        self.nodes = [(math.inf, None, None), (math.inf, None, None)]
+        self.unique = dict()
+        self.cache = dict()
+
+    def level(self, name):
+        """Returns the level of a symbol, putting new ones at the bottom."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+        return self.levels[name]
+
+    def node(self, level, low, high):
+        """Returns the node testing `level`, with no duplicates."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        if key not in self.unique:
+            self.unique[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.unique[key]
+
+    def compile(self, sentence):
+        """Returns the node of the BDD of `sentence`."""
+        if isinstance(sentence, Symbol):
+            return self.node(self.level(sentence.name), 0, 1)
+        if isinstance(sentence, Not):
+            return self.apply("xor", self.compile(sentence.operand), 1)
+        if isinstance(sentence, And):
+            u = 1
+            for conjunct in sentence.conjuncts:
+                u = self.apply("and", u, self.compile(conjunct))
+            return u
+        if isinstance(sentence, Or):
+            u = 0
+            for disjunct in sentence.disjuncts:
+                u = self.apply("or", u, self.compile(disjunct))
+            return u
+        if isinstance(sentence, Implication):
+            return self.apply("implies", self.compile(sentence.antecedent),
+                              self.compile(sentence.consequent))
+        if isinstance(sentence, Biconditional):
+            return self.apply("iff", self.compile(sentence.left),
+                              self.compile(sentence.right))
+        raise TypeError("must be a logical sentence")
+
+    def apply(self, operator, u, v):
+        """Returns the node of `operator` ("and", "or"...) on u and v."""
+        if u <= 1 and v <= 1:
+            return int(OPERATORS[operator](u, v))
+        if operator == "and" and (u == 0 or v == 0):
+            return 0
+        if operator == "or" and (u == 1 or v == 1):
+            return 1
+        key = (operator, u, v)
+        if key in self.cache:
+            return self.cache[key]
+
+        # Split both on the symbol tested highest up
+        u_level, u_low, u_high = self.nodes[u]
+        v_level, v_low, v_high = self.nodes[v]
+        level = min(u_level, v_level)
+        if u_level != level:
+            u_low = u_high = u
+        if v_level != level:
+            v_low = v_high = v
+        result = self.node(level, self.apply(operator, u_low, v_low),
+                           self.apply(operator, u_high, v_high))
+        self.cache[key] = result
+        return result
+
+    def entails(self, knowledge, query):
+        """Returns True if node `knowledge` entails node `query`."""
+        return self.apply("implies", knowledge, query) == 1
+
+    def count(self, u):
+        """Returns the number of models of node u over all the symbols."""
+        symbols = len(self.order)
+        counts = {0: 0, 1: 1}
+
+        def below(u):
+            """Returns the models of u over the symbols from its level on."""
+            if u not in counts:
+                level, low, high = self.nodes[u]
+                counts[u] = sum(
+                    below(child) * 2 ** (min(self.nodes[child][0], symbols)
+                                         - level - 1)
+                    for child in (low, high)
+                )
+            return counts[u]
+
+        return below(u) * 2 ** min(self.nodes[u][0], symbols)
+
+    def forced(self, u):
+        """
+        Returns a dict with the value of every symbol that is the same in
+        all models of node u, by one pass over the nodes under u: a symbol
+        is forced if no path to true skips it and all of them take the
+        same branch at it.
+        """
+        if u == 0:
+            return dict()
+        symbols = len(self.order)
+        skipped = [0] * (symbols + 1)
+        branches = [set() for level in range(symbols)]
+
+        def skip(start, end):
+            """Marks the levels from start up to end (excluded) skipped."""
+            skipped[start] += 1
+            skipped[end] -= 1
+
+        skip(0, min(self.nodes[u][0], symbols))
+        seen = {u}
+        stack = [u]
+        while stack:
+            level, low, high = self.nodes[stack.pop()]
+            if level == math.inf:
+                continue
+            for branch, child in [(False, low), (True, high)]:
+                if child == 0:
+                    continue
+                branches[level].add(branch)
+                skip(level + 1, min(self.nodes[child][0], symbols))
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+
+        forced = dict()
+        count = 0
+        for level, name in enumerate(self.order):
+            count += skipped[level]
+            if not count and len(branches[level]) == 1:
+                forced[name] = branches[level].pop()
+        return forced
+
+
+# Truth tables of the operators a BDD can apply
+OPERATORS = {
+    "and": lambda p, q: p and q,
+    "or": lambda p, q: p or q,
+    "xor": lambda p, q: p != q,
+    "implies": lambda p, q: not p or q,
+    "iff": lambda p, q: p == q,
+}
+
+
+# Entailment engines model_check can use
+ENGINES = {
+    "enumerate": enumerate_check,
+    "bdd": bdd_check,
+    "bitwise": bitwise_check,
+    "parallel": parallel_check,
+    "prune": prune_check,
+    "sat": sat_check,
+}
+
+# Engines that check many queries against one knowledge base together
+BATCH_ENGINES = {
+    "bdd": bdd_check_all,
+    "enumerate": enumerate_check_all,
+    "sat": sat_check_all,
+}
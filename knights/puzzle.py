@@ -1,3 +1,5 @@
+import sys
+
 from logic import *
 
 AKnight = Symbol("A is a Knight")
@@ -76,6 +78,12 @@ knowledge3 = And(
 
 
 def main():
+
+    # Use the entailment engine given on the command line, if any
+    if len(sys.argv) > 2 or len(sys.argv) == 2 and sys.argv[1] not in ENGINES:
+        sys.exit(f"Usage: python puzzle.py [{' | '.join(ENGINES)}]")
+    engine = sys.argv[1] if len(sys.argv) == 2 else "enumerate"
+
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
     puzzles = [
         ("Puzzle 0", knowledge0),
@@ -88,8 +96,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            entailed = model_check_all(knowledge, symbols, engine)
+            for symbol, entails in zip(symbols, entailed):
+                if entails:
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,92 @@
+import sys
+import time
+
+import bitboard
+import mcts
+import mnk
+import tictactoe as ttt
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) == 3 and sys.argv[1] == "perft":
+        perft(int(sys.argv[2]))
+    elif len(sys.argv) == 1:
+        compare()
+    else:
+        sys.exit("Usage: python benchmark.py [perft depth]")
+
+
+def perft(depth):
+    """
+    Prints the number of positions at every depth up to `depth` from the
+    initial state, and how fast they were counted.
+    """
+    for d in range(depth + 1):
+        start = time.perf_counter()
+        count = ttt.perft(ttt.initial_state(), d)
+        seconds = time.perf_counter() - start
+        print(f"perft({d}) = {count} in {seconds:.4f}s")
+
+
+def compare():
+    """
+    Prints the time every search takes to find the first move, with its
+    counters and nodes per second.
+    """
+    perfect_play = ttt.perfect_play
+    print(f"{'engine':<22}{'move':>8}{'seconds':>10}{'nodes':>10}"
+          f"{'nodes/s':>11}{'terminals':>11}{'cutoffs':>9}{'table hits':>12}")
+    for name, search, reset, counters in engines(perfect_play):
+        reset()
+        start = time.perf_counter()
+        move = search(ttt.initial_state())
+        seconds = time.perf_counter() - start
+        stats = counters()
+        nodes = stats.get("nodes", 0)
+        print(f"{name:<22}{str(move):>8}{seconds:>10.4f}{nodes:>10}"
+              f"{nodes / seconds:>11.0f}{stats.get('terminals', '-'):>11}"
+              f"{stats.get('cutoffs', '-'):>9}{stats.get('table_hits', '-'):>12}")
+    ttt.perfect_play = perfect_play
+
+
+def engines(perfect_play):
+    """
+    Returns a list of (name, search, reset, counters) for every search
+    engine, where search takes a board and returns a move, reset gets it
+    ready to be timed and counters returns its counters afterwards.
+    For MCTS the nodes counted are playouts.
+    """
+
+    def fresh(table=None):
+        """Returns a reset for tictactoe.py searches with empty tables."""
+        def reset():
+            ttt.perfect_play = table
+            ttt.table.clear()
+            ttt.reset_stats()
+        return reset
+
+    def warm():
+        ttt.perfect_play = None
+        ttt.reset_stats()
+
+    found = [
+        ("minimax", ttt.minimax, fresh(), lambda: ttt.stats),
+        ("minimax (warm table)", ttt.minimax, warm, lambda: ttt.stats),
+        ("alphabeta", ttt.alphabeta, fresh(), lambda: ttt.stats),
+        ("bitboard", bitboard.minimax, bitboard.reset_stats,
+         lambda: bitboard.stats),
+        ("mnk", lambda board: mnk.minimax(board, 3, 60), lambda: None,
+         lambda: mnk.stats),
+        ("mcts", mcts.minimax, lambda: None,
+         lambda: {"nodes": mcts.stats["playouts"]}),
+    ]
+    if perfect_play is not None:
+        found.append(("perfect play", ttt.minimax, fresh(perfect_play),
+                      lambda: ttt.stats))
+    return found
+
+
+if __name__ == "__main__":
+    main()
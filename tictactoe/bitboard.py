@@ -0,0 +1,203 @@
+"""
+Tic Tac Toe Player on bitboards
+
+A position is a tuple (x, o) of two integers where bit 3 * i + j is set
+if that player has a mark in row i, column j.
+"""
+
+import time
+
+from tictactoe import X, O, EMPTY, CHECK_EVERY, Cancelled, stop
+
+FULL = 0b111111111
+
+# The 3 rows, 3 columns and 2 diagonals
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+]
+
+# Counters for the searches since the last call to reset_stats()
+stats = {
+    "nodes": 0,
+    "terminals": 0,
+    "cutoffs": 0,
+    "seconds": 0
+}
+
+
+def from_board(board):
+    """
+    Returns the bitboard position of a list of lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(position):
+    """
+    Returns the list of lists board of a bitboard position.
+    """
+    x, o = position
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+
+def player(position):
+    """
+    Returns player who has the next turn in a position.
+    """
+    x, o = position
+    return X if x.bit_count() == o.bit_count() else O
+
+
+def actions(position):
+    """
+    Returns the list of bits of the empty cells in a position.
+    """
+    x, o = position
+    empty = FULL & ~(x | o)
+    moves = []
+    while empty:
+        move = empty & -empty
+        moves.append(move)
+        empty ^= move
+    return moves
+
+
+def result(position, move):
+    """
+    Returns the position that results from playing the bit `move`.
+    """
+    x, o = position
+    if move & (x | o) or not move & FULL:
+        raise NameError("unavailable move")
+    if x.bit_count() == o.bit_count():
+        return x | move, o
+    return x, o | move
+
+
+def wins(bits):
+    """
+    Returns True if the marks in `bits` fill a line.
+    """
+    for line in LINES:
+        if bits & line == line:
+            return True
+    return False
+
+
+def winner(position):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = position
+    if wins(x):
+        return X
+    elif wins(o):
+        return O
+    return None
+
+
+def terminal(position):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = position
+    return (x | o) == FULL or wins(x) or wins(o)
+
+
+def utility(position):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = position
+    if wins(x):
+        return 1
+    elif wins(o):
+        return -1
+    return 0
+
+
+def to_action(move):
+    """
+    Returns the (i, j) action of the bit `move`.
+    """
+    k = move.bit_length() - 1
+    return (k // 3, k % 3)
+
+
+def reset_stats():
+    """
+    Sets all search counters back to 0.
+    """
+    for counter in stats:
+        stats[counter] = 0
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on a list of lists
+    board, searching on bitboards.
+    """
+    position = from_board(board)
+    if terminal(position):
+        return None
+    start = time.perf_counter()
+    try:
+        move = value(position, -2, 2)[1]
+    finally:
+        stats["seconds"] += time.perf_counter() - start
+    return to_action(move)
+
+
+def value(position, alpha, beta):
+    """
+    Returns [value, move] for a position with alpha-beta pruning, where
+    value is exact if it is strictly between alpha and beta.
+    """
+    stats["nodes"] += 1
+    if stats["nodes"] % CHECK_EVERY == 0 and stop.is_set():
+        raise Cancelled
+    x, o = position
+    if wins(x):
+        stats["terminals"] += 1
+        return [1, None]
+    elif wins(o):
+        stats["terminals"] += 1
+        return [-1, None]
+
+    taken = x | o
+    if taken == FULL:
+        stats["terminals"] += 1
+        return [0, None]
+
+    maximizing = x.bit_count() == o.bit_count()
+    returned_value = [-2, None] if maximizing else [2, None]
+    empty = FULL & ~taken
+    while empty:
+        move = empty & -empty
+        empty ^= move
+        if maximizing:
+            returned = value((x | move, o), alpha, beta)[0]
+            if returned > returned_value[0]:
+                returned_value = [returned, move]
+                alpha = max(alpha, returned)
+        else:
+            returned = value((x, o | move), alpha, beta)[0]
+            if returned < returned_value[0]:
+                returned_value = [returned, move]
+                beta = min(beta, returned)
+        if alpha >= beta:
+            stats["cutoffs"] += 1
+            break
+
+    return returned_value
@@ -0,0 +1,169 @@
+"""
+Monte-Carlo Tree Search Player
+
+Plays m,n,k games by growing a search tree with UCT and judging new
+positions by the result of random games played from them, so it works on
+boards far too big to search to the end.
+"""
+
+import math
+import multiprocessing
+import random
+import time
+
+from mnk import Game, K
+from tictactoe import Cancelled, stop
+
+# Random games played for every move, split between the processes
+PLAYOUTS = 20000
+
+# Exploration constant of UCT
+EXPLORATION = math.sqrt(2)
+
+# Counters for the last search, over all processes
+stats = {
+    "playouts": 0,
+    "nodes": 0,
+    "seconds": 0
+}
+
+
+class Node():
+    """
+    Position in the search tree, reached by `player` making `move`.
+    """
+
+    def __init__(self, parent, move, player, moves):
+        self.parent = parent
+        self.move = move
+        self.player = player
+        self.untried = moves
+        self.children = []
+        self.visits = 0
+        self.wins = 0
+
+    def select(self):
+        """
+        Returns the child with the best UCT score: how often the child's
+        player won from there, plus a bonus for children seldom visited.
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: (
+            child.wins / child.visits +
+            EXPLORATION * math.sqrt(log_visits / child.visits)
+        ))
+
+
+def minimax(board):
+    """
+    Returns the action MCTS picks for the current player on the board, so
+    it can be used in place of `minimax` in tictactoe.py.
+    """
+    return mcts(board)
+
+
+def mcts(board, k=None, playouts=PLAYOUTS, budget=None, processes=1, seed=None):
+    """
+    Returns the action (i, j) for the current player on a board of any
+    size, or None if the game is over.
+
+    The search stops after `playouts` random games, or after `budget`
+    seconds if that is not None, whichever comes first, but always plays
+    at least one game. With more than
+    one process, every process grows its own tree from a different seed
+    (root parallelism) and the visits of the root moves are added up.
+    `k` defaults to K, or the board size if that is smaller.
+    """
+    if k is None:
+        k = min(K, len(board), len(board[0]))
+    if Game(board, k).terminal():
+        return None
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    start = time.perf_counter()
+
+    tasks = [(board, k, playouts // processes, budget, seed + i)
+             for i in range(processes)]
+    if processes == 1:
+        results = [search(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(search, tasks)
+
+    # Pick the most visited move over all the trees
+    visits = dict()
+    stats["playouts"] = stats["nodes"] = 0
+    for result, nodes in results:
+        for move, count in result.items():
+            visits[move] = visits.get(move, 0) + count
+            stats["playouts"] += count
+        stats["nodes"] += nodes
+    stats["seconds"] = time.perf_counter() - start
+    if visits:
+        move = max(visits, key=visits.get)
+    else:
+        move = random.Random(seed).choice(Game(board, k).actions())
+    return (move // len(board[0]), move % len(board[0]))
+
+
+def search(task):
+    """
+    Grows one search tree, where `task` is a tuple
+    (board, k, playouts, budget, seed). Returns a tuple (visits, nodes)
+    with the number of visits of every move from the root and the number
+    of nodes in the tree.
+    """
+    board, k, playouts, budget, seed = task
+    rng = random.Random(seed)
+    game = Game(board, k)
+    root = Node(None, None, None, game.actions())
+    nodes = 1
+    deadline = None if budget is None else time.perf_counter() + budget
+
+    # Always finish one playout, so that the root has a move to pick
+    for playout in range(max(playouts, 1)):
+        if (playout and deadline is not None
+                and time.perf_counter() > deadline):
+            break
+        if stop.is_set():
+            raise Cancelled
+
+        # Walk down the tree along the best UCT scores
+        node = root
+        while not node.untried and node.children:
+            node = node.select()
+            game.make_move(node.move)
+
+        # Add one new position to the tree
+        if node.untried and not game.terminal():
+            move = node.untried.pop(rng.randrange(len(node.untried)))
+            player = game.player
+            game.make_move(move)
+            child = Node(node, move, player,
+                         [] if game.terminal() else game.actions())
+            node.children.append(child)
+            node = child
+            nodes += 1
+
+        # Play randomly until the game is over
+        played = 0
+        while not game.terminal():
+            moves = game.actions()
+            game.make_move(moves[rng.randrange(len(moves))])
+            played += 1
+        winner = game.winner
+        for move in range(played):
+            game.undo_move()
+
+        # Count the result in every position on the way back up
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1
+            if node.parent is not None:
+                game.undo_move()
+            node = node.parent
+
+    return {child.move: child.visits for child in root.children}, nodes
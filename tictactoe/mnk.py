@@ -0,0 +1,248 @@
+"""
+m,n,k Game Player
+
+Plays on boards of any size (m rows, n columns) where k marks in a row,
+column or diagonal win, using iterative deepening alpha-beta search with a
+heuristic evaluation and a time budget for every move.
+"""
+
+import sys
+import time
+
+from tictactoe import X, O, EMPTY
+
+# Marks in a row needed to win when k isn't given (or fewer on small boards)
+K = 4
+
+# Seconds the search may take for one move
+BUDGET = 1.0
+
+# Score of a win, minus the number of moves it takes to get there
+WIN = 10 ** 12
+
+# Nodes between checks of the clock
+CHECK_EVERY = 1024
+
+# Counters for the last search
+stats = {
+    "depth": 0,
+    "nodes": 0,
+    "seconds": 0,
+    "nodes_per_second": 0
+}
+
+
+class Timeout(Exception):
+    """Raised when a search runs out of time."""
+
+
+class Game():
+    """
+    m,n,k game position that moves can be made on and undone in place.
+
+    For every window of k cells in a line, the game keeps how many marks
+    each player has in it, so a win is found by only looking at the windows
+    through the last move, and the evaluation doesn't scan the board.
+    """
+
+    def __init__(self, board, k):
+        self.m = len(board)
+        self.n = len(board[0])
+        self.k = k
+        self.cells = [cell for row in board for cell in row]
+
+        # Every window of k cells in a row, column or diagonal
+        self.windows = []
+        for i in range(self.m):
+            for j in range(self.n):
+                for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < self.m and 0 <= end_j < self.n:
+                        self.windows.append(tuple(
+                            (i + di * step) * self.n + (j + dj * step)
+                            for step in range(k)
+                        ))
+        self.cell_windows = [[] for cell in self.cells]
+        for w, window in enumerate(self.windows):
+            for cell in window:
+                self.cell_windows[cell].append(w)
+
+        self.counts = {X: [0] * len(self.windows), O: [0] * len(self.windows)}
+        for w, window in enumerate(self.windows):
+            for cell in window:
+                if self.cells[cell] != EMPTY:
+                    self.counts[self.cells[cell]][w] += 1
+
+        marks = sum(cell != EMPTY for cell in self.cells)
+        self.empty = len(self.cells) - marks
+        self.player = X if marks % 2 == 0 else O
+        self.winner = None
+        for player in [X, O]:
+            if k in self.counts[player]:
+                self.winner = player
+        self.history = []
+
+        # Cells closest to the centre first
+        centre_i, centre_j = (self.m - 1) / 2, (self.n - 1) / 2
+        self.order = sorted(
+            range(len(self.cells)),
+            key=lambda cell: (abs(cell // self.n - centre_i) +
+                              abs(cell % self.n - centre_j))
+        )
+
+    def terminal(self):
+        """Returns True if game is over, False otherwise."""
+        return self.winner is not None or self.empty == 0
+
+    def actions(self):
+        """Returns the empty cells, closest to the centre first."""
+        return [cell for cell in self.order if self.cells[cell] == EMPTY]
+
+    def make_move(self, cell):
+        """Puts the current player's mark on `cell`."""
+        player = self.player
+        self.cells[cell] = player
+        self.empty -= 1
+        counts = self.counts[player]
+        for w in self.cell_windows[cell]:
+            counts[w] += 1
+            if counts[w] == self.k:
+                self.winner = player
+        self.player = O if player == X else X
+        self.history.append(cell)
+
+    def undo_move(self):
+        """Takes back the last move."""
+        cell = self.history.pop()
+        player = self.cells[cell]
+        self.cells[cell] = EMPTY
+        self.empty += 1
+        counts = self.counts[player]
+        for w in self.cell_windows[cell]:
+            counts[w] -= 1
+        self.player = player
+        self.winner = None
+
+    def evaluate(self):
+        """
+        Returns a heuristic score of the position for the player to move:
+        every window that only one player has marks in is worth 10 to the
+        power of the number of marks to that player.
+        """
+        score = 0
+        for x, o in zip(self.counts[X], self.counts[O]):
+            if x and not o:
+                score += 10 ** x
+            elif o and not x:
+                score -= 10 ** o
+        return score if self.player == X else -score
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [4, 5]:
+        sys.exit("Usage: python mnk.py m n k [budget]")
+    m, n, k = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
+    budget = float(sys.argv[4]) if len(sys.argv) == 5 else BUDGET
+
+    # Let the AI play against itself
+    board = [[EMPTY] * n for i in range(m)]
+    game = Game(board, k)
+    while not game.terminal():
+        i, j = minimax(board, k, budget)
+        board[i][j] = game.player
+        game.make_move(i * n + j)
+        print(f"{board[i][j]} plays {(i, j)}: depth {stats['depth']}, "
+              f"{stats['nodes']} nodes, {stats['nodes_per_second']:.0f} nodes/s")
+    for row in board:
+        print(" ".join(cell or "." for cell in row))
+    print(f"Winner: {game.winner}")
+
+
+def minimax(board, k=None, budget=BUDGET):
+    """
+    Returns the best action (i, j) the search finds for the current player
+    on a board of any size within `budget` seconds, or None if the game
+    is over. `k` defaults to K, or the board size if that is smaller.
+    """
+    if k is None:
+        k = min(K, len(board), len(board[0]))
+    game = Game(board, k)
+    if game.terminal():
+        return None
+    cell = search(game, budget)
+    return (cell // game.n, cell % game.n)
+
+
+def search(game, budget):
+    """
+    Returns the best cell to play in `game`, searching one ply deeper each
+    time until `budget` seconds have passed or the result is certain.
+    The first depth always finishes, whatever the budget.
+    """
+    start = time.perf_counter()
+    deadline = start + budget
+    stats["nodes"] = 0
+    best = None
+    depth = 0
+    while depth < game.empty:
+        depth += 1
+        try:
+            value, cell = value_of(game, depth, -WIN - 1, WIN + 1, 0,
+                                   deadline if depth > 1 else None, best)
+        except Timeout:
+            depth -= 1
+            break
+        best = cell
+        if abs(value) >= WIN - game.empty:
+            break
+
+    seconds = time.perf_counter() - start
+    stats["depth"] = depth
+    stats["seconds"] = seconds
+    stats["nodes_per_second"] = stats["nodes"] / seconds if seconds else 0
+    return best
+
+
+def value_of(game, depth, alpha, beta, ply, deadline, first=None):
+    """
+    Returns (value, cell) for the player to move in `game` searching
+    `depth` plies ahead with alpha-beta pruning, trying `first` first.
+    Raises Timeout once `deadline` has passed, unless it is None.
+    """
+    stats["nodes"] += 1
+    if deadline is not None and stats["nodes"] % CHECK_EVERY == 0:
+        if time.perf_counter() > deadline:
+            raise Timeout
+
+    if game.winner is not None:
+        return -(WIN - ply), None
+    if game.empty == 0:
+        return 0, None
+    if depth == 0:
+        return game.evaluate(), None
+
+    moves = game.actions()
+    if first is not None:
+        moves.remove(first)
+        moves.insert(0, first)
+
+    best = (-WIN - 1, None)
+    for cell in moves:
+        game.make_move(cell)
+        try:
+            value = -value_of(game, depth - 1, -beta, -alpha, ply + 1,
+                              deadline)[0]
+        finally:
+            game.undo_move()
+        if value > best[0]:
+            best = (value, cell)
+            alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+    return best
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
 import pygame
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
+import bitboard
+import mcts
 import tictactoe as ttt
 
+# Searches the AI can use, chosen on the command line
+ENGINES = {
+    "minimax": ttt.minimax,
+    "alphabeta": ttt.alphabeta,
+    "bitboard": bitboard.minimax,
+    "mcts": mcts.minimax
+}
+if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] not in ENGINES):
+    sys.exit(f"Usage: python runner.py [{' | '.join(ENGINES)}]")
+engine = ENGINES[sys.argv[1] if len(sys.argv) == 2 else "minimax"]
+
 pygame.init()
 size = width, height = 600, 400
 
+# Frames drawn per second at most
+FPS = 30
+
 # Colors
 black = (0, 0, 0)
 white = (255, 255, 255)
@@ -19,13 +35,36 @@ moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The AI searches in a background thread so the window keeps responding
+executor = ThreadPoolExecutor(max_workers=1)
+ai_move = None
+clock = pygame.time.Clock()
+
+
+def stop_search(search):
+    """
+    Makes a running search give up (the engines check ttt.stop as they
+    go and raise ttt.Cancelled) and waits until it has, so the thread is
+    free again.
+    """
+    if search is not None:
+        ttt.stop.set()
+        wait([search])
+        ttt.stop.clear()
+
 
 while True:
 
+    # Keep the position of a left click made since the last frame, if any
+    click = None
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            stop_search(ai_move)
+            executor.shutdown()
             sys.exit()
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            click = event.pos
 
     screen.fill(black)
 
@@ -54,14 +93,11 @@ while True:
         screen.blit(playO, playORect)
 
         # Check if button is clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
+        if click is not None:
+            mouse = click
             if playXButton.collidepoint(mouse):
-                time.sleep(0.2)
                 user = ttt.X
             elif playOButton.collidepoint(mouse):
-                time.sleep(0.2)
                 user = ttt.O
 
     else:
@@ -108,20 +144,17 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, starting the search or applying its result
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_move is None:
+                ai_move = executor.submit(engine, board)
+            elif ai_move.done():
+                board = ttt.result(board, ai_move.result())
+                ai_move = None
 
         # Check for a user move
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1 and user == player and not game_over:
-            mouse = pygame.mouse.get_pos()
+        if click is not None and user == player and not game_over:
+            mouse = click
             for i in range(3):
                 for j in range(3):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
@@ -134,13 +167,13 @@ while True:
             againRect.center = againButton.center
             pygame.draw.rect(screen, white, againButton)
             screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
+            if click is not None:
+                mouse = click
                 if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
+                    stop_search(ai_move)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    ai_move = None
 
     pygame.display.flip()
+    clock.tick(FPS)
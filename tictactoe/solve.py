@@ -0,0 +1,49 @@
+import sys
+
+import bitboard
+import tictactoe as ttt
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python solve.py [output]")
+    filename = sys.argv[1] if len(sys.argv) == 2 else ttt.PERFECT_PLAY_FILE
+
+    solved = dict()
+    solve((0, 0), solved)
+    table = bytearray([ttt.NO_ENTRY] * 3 ** 9)
+    for position, (value, move) in solved.items():
+        key = ttt.board_key(bitboard.to_board(position))
+        move = 15 if move is None else move.bit_length() - 1
+        table[key] = (value + 1) * 16 + move
+    with open(filename, "wb") as f:
+        f.write(table)
+    print(f"Solved {len(solved)} positions into {filename}")
+
+
+def solve(position, solved):
+    """
+    Adds to `solved` the (value, move) of the position and of every
+    position that can follow it, where move is the bit of the best move,
+    or None if the game is over. Returns the value of the position.
+    """
+    if position in solved:
+        return solved[position][0]
+    if bitboard.terminal(position):
+        solved[position] = (bitboard.utility(position), None)
+        return solved[position][0]
+
+    maximizing = bitboard.player(position) == ttt.X
+    best = None
+    for move in bitboard.actions(position):
+        value = solve(bitboard.result(position, move), solved)
+        if best is None or (value > best[0] if maximizing else value < best[0]):
+            best = (value, move)
+    solved[position] = best
+    return best[0]
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,55 @@ Tic Tac Toe Player
 
 import math
 import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Order in which alpha-beta tries moves: centre, then corners, then edges
+MOVE_ORDER = [(1, 1),
+              (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Counters for the searches since the last call to reset_stats()
+stats = {
+    "nodes": 0,
+    "terminals": 0,
+    "cutoffs": 0,
+    "table_hits": 0,
+    "seconds": 0
+}
+
+# File written by solve.py with the value and best move of every position
+PERFECT_PLAY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "perfect_play.bin")
+
+# Entry of the perfect play table for positions that can't happen
+NO_ENTRY = 0xFF
+
+# Kinds of values stored in the transposition table
+EXACT = "exact"
+LOWER = "lower"
+UPPER = "upper"
+
+# Last move that caused a cutoff at every depth of the alpha-beta search
+killers = dict()
+
+# Nodes between checks of the stop flag
+CHECK_EVERY = 256
+
+# Set from another thread to make a running search give up with Cancelled
+stop = threading.Event()
+
+
+class Cancelled(Exception):
+    """Raised when a search is stopped before it finishes."""
+
 
 def initial_state():
     """
@@ -138,6 +182,109 @@ def utility(board):
     #raise NotImplementedError
 
 
+# The 3 rows, 3 columns and 2 diagonals of the board
+LINES = ([[(i, j) for j in range(3)] for i in range(3)] +
+         [[(i, j) for i in range(3)] for j in range(3)] +
+         [[(i, i) for i in range(3)], [(i, 2 - i) for i in range(3)]])
+
+
+class SearchBoard():
+    """
+    Board that the search makes and undoes moves on in place, instead of
+    copying the whole board for every move like `result`.
+
+    It keeps the number of marks of each player, the player to move and how
+    many marks each player has on every line up to date, so finding the
+    winner only looks at the lines through the last move. It also keeps the
+    hashes of the board's 8 rotations and reflections up to date (see
+    `symmetric_hashes`), so the transposition table never has to read the
+    cells.
+    """
+
+    def __init__(self, board):
+        self.cells = [list(row) for row in board]
+        self.counts = {X: 0, O: 0}
+        self.line_counts = {X: [0] * len(LINES), O: [0] * len(LINES)}
+        self.cell_lines = [[[] for j in range(3)] for i in range(3)]
+        for line, cells in enumerate(LINES):
+            for i, j in cells:
+                self.cell_lines[i][j].append(line)
+                if self.cells[i][j] != EMPTY:
+                    self.line_counts[self.cells[i][j]][line] += 1
+        for row in self.cells:
+            for cell in row:
+                if cell != EMPTY:
+                    self.counts[cell] += 1
+        self.player = X if self.counts[X] == self.counts[O] else O
+        self.winner = winner(self.cells)
+        self.hashes = symmetric_hashes(self.cells)
+        self.history = []
+
+    def terminal(self):
+        """Returns True if game is over, False otherwise."""
+        return self.winner is not None or self.counts[X] + self.counts[O] == 9
+
+    def utility(self):
+        """Returns 1 if X has won the game, -1 if O has won, 0 otherwise."""
+        return 1 if self.winner == X else -1 if self.winner == O else 0
+
+    def actions(self):
+        """Returns a list of all possible actions (i, j) on the board."""
+        return [(i, j) for i in range(3) for j in range(3)
+                if self.cells[i][j] == EMPTY]
+
+    def make_move(self, action):
+        """Puts the mark of the player to move on `action`."""
+        i, j = action
+        if self.cells[i][j] != EMPTY:
+            raise NameError("unavailable move")
+        player = self.player
+        self.history.append((action, self.winner))
+        self.cells[i][j] = player
+        self.counts[player] += 1
+        line_counts = self.line_counts[player]
+        for line in self.cell_lines[i][j]:
+            line_counts[line] += 1
+            if line_counts[line] == 3:
+                self.winner = player
+        mark = 1 if player == X else 2
+        hashes = self.hashes
+        for symmetry, weight in enumerate(HASH_WEIGHTS[3 * i + j]):
+            hashes[symmetry] += mark * weight
+        self.player = O if player == X else X
+
+    def undo_move(self):
+        """Takes back the last move."""
+        (i, j), self.winner = self.history.pop()
+        player = self.cells[i][j]
+        self.cells[i][j] = EMPTY
+        self.counts[player] -= 1
+        line_counts = self.line_counts[player]
+        for line in self.cell_lines[i][j]:
+            line_counts[line] -= 1
+        mark = 1 if player == X else 2
+        hashes = self.hashes
+        for symmetry, weight in enumerate(HASH_WEIGHTS[3 * i + j]):
+            hashes[symmetry] -= mark * weight
+        self.player = player
+
+
+def timed(search):
+    """
+    Decorates a search so the time taken by every call is added to
+    stats["seconds"].
+    """
+    @functools.wraps(search)
+    def timed_search(board):
+        start = time.perf_counter()
+        try:
+            return search(board)
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+    return timed_search
+
+
+@timed
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
@@ -145,65 +292,361 @@ def minimax(board):
     if terminal(board) == True:
         return None
 
+    # Answer straight from the perfect play table if there is one
+    entry = perfect_play_entry(board)
+    if entry is not None and entry[1] is not None:
+        stats["table_hits"] += 1
+        return entry[1]
+
     action = (-1, -1)
+    state = SearchBoard(board)
 
-    if player(board) == X:
-        action = max_value(board)
+    if state.player == X:
+        action = max_value(state)
 
-    elif player(board) == O:
-        action = min_value(board)
+    elif state.player == O:
+        action = min_value(state)
 
     return action[1]
     #raise NotImplementedError
 
 
-def max_value(board):
-    if terminal(board) == True:
+def max_value(state):
+    stats["nodes"] += 1
+    if stats["nodes"] % CHECK_EVERY == 0 and stop.is_set():
+        raise Cancelled
+    if state.terminal():
+        stats["terminals"] += 1
         return None
 
+    entry = table.lookup(state.hashes)
+    if entry is not None and entry[2] == EXACT:
+        stats["table_hits"] += 1
+        return [entry[0], entry[1]]
+
     returned_value = [-2, ()]
-    moves = actions(board)
+    moves = state.actions()
     for move in moves:
-        newBoard = result(board, move)
-        returned = min_value(newBoard)
+        state.make_move(move)
+        returned = min_value(state)
         if returned == None:
-            if winner(newBoard) == X:
-                return  [1, move]
-
-            elif winner(newBoard) == X:
-                return  [-1, move]
-            else:
-                return [0, move]
+            returned_value = [state.utility(), move]
+        state.undo_move()
+        if returned == None:
+            break
 
         else:
             if returned_value[0] < returned[0]:
                 returned_value[0] = returned[0]
                 returned_value[1] = move
 
+    table.store(state.hashes, returned_value[0], returned_value[1], EXACT)
     return returned_value
 
-def min_value(board):
-    if terminal(board) == True:
+
+def min_value(state):
+    stats["nodes"] += 1
+    if stats["nodes"] % CHECK_EVERY == 0 and stop.is_set():
+        raise Cancelled
+    if state.terminal():
+        stats["terminals"] += 1
         return None
 
+    entry = table.lookup(state.hashes)
+    if entry is not None and entry[2] == EXACT:
+        stats["table_hits"] += 1
+        return [entry[0], entry[1]]
+
     returned_value = [2, ()]
-    moves = actions(board)
+    moves = state.actions()
     for move in moves:
-        newBoard = result(board, move)
-        returned = max_value(newBoard)
+        state.make_move(move)
+        returned = max_value(state)
         if returned == None:
-            if winner(newBoard) == X:
-                return  [1, move]
-
-            elif winner(newBoard) == O:
-                return  [-1, move]
-
-            else:
-                return [0, move]
+            returned_value = [state.utility(), move]
+        state.undo_move()
+        if returned == None:
+            break
 
         else:
             if returned_value[0] > returned[0]:
                 returned_value[0] = returned[0]
                 returned_value[1] = move
 
+    table.store(state.hashes, returned_value[0], returned_value[1], EXACT)
     return returned_value
+
+
+def board_key(board):
+    """
+    Returns the board as a number in base 3, reading cells row by row with
+    0 for EMPTY, 1 for X and 2 for O.
+    """
+    key = 0
+    for row in board:
+        for cell in row:
+            key = 3 * key + (0 if cell == EMPTY else 1 if cell == X else 2)
+    return key
+
+
+def load_perfect_play(filename=PERFECT_PLAY_FILE):
+    """
+    Returns the perfect play table written by solve.py, or None if there
+    isn't one. Byte `board_key(board)` of the table is NO_ENTRY if the
+    board can't happen, and otherwise (value + 1) * 16 + move, where move
+    is 3 * i + j for the best action (i, j), or 15 if the game is over.
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) != 3 ** 9:
+        return None
+    return data
+
+
+def perfect_play_entry(board):
+    """
+    Returns (value, action) for the board from the perfect play table,
+    where action is None if the game is over, or None if the table is
+    missing or doesn't have the board.
+    """
+    if perfect_play is None:
+        return None
+    entry = perfect_play[board_key(board)]
+    if entry == NO_ENTRY:
+        return None
+    value, move = entry // 16 - 1, entry % 16
+    if move == 15:
+        return value, None
+    return value, (move // 3, move % 3)
+
+
+def reset_stats():
+    """
+    Sets all search counters back to 0.
+    """
+    for counter in stats:
+        stats[counter] = 0
+
+
+@timed
+def alphabeta(board):
+    """
+    Returns the optimal action for the current player on the board, like
+    minimax, but skips the moves that can't change the result.
+    """
+    if terminal(board):
+        return None
+
+    killers.clear()
+    return alphabeta_value(SearchBoard(board), -2, 2, 0)[1]
+
+
+def alphabeta_value(state, alpha, beta, depth):
+    """
+    Returns [value, move] for the SearchBoard, where value is exact if it is
+    strictly between alpha and beta, and otherwise only a bound on it.
+    """
+    stats["nodes"] += 1
+    if stats["nodes"] % CHECK_EVERY == 0 and stop.is_set():
+        raise Cancelled
+    if state.terminal():
+        stats["terminals"] += 1
+        return [state.utility(), None]
+
+    # Use what an earlier search found out about this position, if enough
+    entry = table.lookup(state.hashes)
+    if entry is not None and (
+        entry[2] == EXACT or
+        (entry[2] == LOWER and entry[0] >= beta) or
+        (entry[2] == UPPER and entry[0] <= alpha)
+    ):
+        stats["table_hits"] += 1
+        return [entry[0], entry[1]]
+
+    original_alpha, original_beta = alpha, beta
+    maximizing = state.player == X
+    returned_value = [-2, None] if maximizing else [2, None]
+    for move in ordered_actions(state, depth):
+        state.make_move(move)
+        value = alphabeta_value(state, alpha, beta, depth + 1)[0]
+        state.undo_move()
+        if maximizing and value > returned_value[0]:
+            returned_value = [value, move]
+            alpha = max(alpha, value)
+        elif not maximizing and value < returned_value[0]:
+            returned_value = [value, move]
+            beta = min(beta, value)
+
+        if alpha >= beta:
+            stats["cutoffs"] += 1
+            killers[depth] = move
+            break
+
+    if returned_value[0] <= original_alpha:
+        table.store(state.hashes, returned_value[0], returned_value[1], UPPER)
+    elif returned_value[0] >= original_beta:
+        table.store(state.hashes, returned_value[0], returned_value[1], LOWER)
+    else:
+        table.store(state.hashes, returned_value[0], returned_value[1], EXACT)
+    return returned_value
+
+
+def ordered_actions(state, depth):
+    """
+    Returns the possible actions on the SearchBoard in the order alpha-beta
+    should try them: the killer move for this depth (the last one that
+    caused a cutoff here) first, then centre, corners and edges.
+    """
+    return sorted(
+        state.actions(),
+        key=lambda move: (move != killers.get(depth), MOVE_ORDER.index(move))
+    )
+
+
+def perft(board, depth):
+    """
+    Returns the number of positions reached by playing every possible
+    sequence of `depth` moves from the board, not counting games that are
+    over before that.
+    """
+    state = SearchBoard(board)
+
+    def count(depth):
+        if depth == 0:
+            return 1
+        if state.terminal():
+            return 0
+        total = 0
+        for move in state.actions():
+            state.make_move(move)
+            total += count(depth - 1)
+            state.undo_move()
+        return total
+
+    return count(depth)
+
+
+def symmetries():
+    """
+    Returns the 8 rotations and reflections of the board as lists of cell
+    indexes: cell k (row k // 3, column k % 3) of the transformed board is
+    cell p[k] of the original board.
+    """
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (j, 2 - i),
+        lambda i, j: (2 - i, 2 - j),
+        lambda i, j: (2 - j, i),
+        lambda i, j: (i, 2 - j),
+        lambda i, j: (2 - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (2 - j, 2 - i)
+    ]
+    permutations = []
+    for transform in transforms:
+        permutation = []
+        for k in range(9):
+            i, j = transform(k // 3, k % 3)
+            permutation.append(3 * i + j)
+        permutations.append(permutation)
+    return permutations
+
+
+SYMMETRIES = symmetries()
+
+# Weight of cell k in the hash of every symmetry: the cell ends up at
+# position SYMMETRIES[s].index(k) of transformed board s, which is read as
+# a number in base 3 like `board_key`
+HASH_WEIGHTS = [
+    [3 ** (8 - permutation.index(k)) for permutation in SYMMETRIES]
+    for k in range(9)
+]
+
+
+def symmetric_hashes(board):
+    """
+    Returns the hashes of the 8 rotations and reflections of the board, in
+    the order of SYMMETRIES, where the hash of a board is its `board_key`.
+    The first one is the hash of the board itself.
+    """
+    hashes = [0] * len(SYMMETRIES)
+    for k in range(9):
+        cell = board[k // 3][k % 3]
+        if cell != EMPTY:
+            mark = 1 if cell == X else 2
+            for symmetry, weight in enumerate(HASH_WEIGHTS[k]):
+                hashes[symmetry] += mark * weight
+    return hashes
+
+
+class TranspositionTable():
+    """
+    Remembers the value and best move of positions that were searched.
+
+    Positions that are rotations or reflections of each other share one
+    entry, stored under the smallest of their 8 hashes. If `size` is not
+    None, at most `size` positions are kept, and the least recently used
+    one is dropped to make room for a new one.
+    """
+
+    def __init__(self, size=None):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def canonical(self, hashes):
+        """
+        Returns (key, permutation) where key is the smallest of the hashes
+        of a board's rotations and reflections, as returned by
+        `symmetric_hashes`, and permutation turns the board into that one
+        (see `symmetries`).
+        """
+        key = min(hashes)
+        return key, SYMMETRIES[hashes.index(key)]
+
+    def lookup(self, hashes):
+        """
+        Returns (value, move, kind) stored for the board with the given
+        symmetric hashes, with the move turned to match the board, or None
+        if the board isn't stored.
+        """
+        key, permutation = self.canonical(hashes)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        value, move, kind = entry
+        if move is not None:
+            k = permutation[move]
+            move = (k // 3, k % 3)
+        return value, move, kind
+
+    def store(self, hashes, value, move, kind):
+        """
+        Stores the value and best move of the board with the given
+        symmetric hashes, where kind is EXACT, LOWER or UPPER depending on
+        whether value is exact or a bound.
+        """
+        key, permutation = self.canonical(hashes)
+        if move is not None:
+            move = permutation.index(3 * move[0] + move[1])
+        self.entries[key] = (value, move, kind)
+        self.entries.move_to_end(key)
+        if self.size is not None and len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+# Positions searched so far in this session
+table = TranspositionTable()
+
+
+# Perfect play table loaded at startup, None if solve.py wasn't run
+perfect_play = load_perfect_play()